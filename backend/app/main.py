@@ -3,19 +3,47 @@ FastAPI Main Entrypoint
 Risk Level: LOW - Simple entrypoint with minimal logic
 """
 
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.auth.login import router as auth_router
 from app.auth.oauth import router as oauth_router
-from app.payment.processor import router as payment_router
+from app.payment import processor
+from app.payment.processor import router as payment_router, webhook_ingestor
+from app.payment.stripe import close_async_stripe_client
 from app.users.crud import router as users_router
 from app.utils.helpers import get_app_info
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop process-wide resources."""
+    if processor.payment_repository is not None:
+        await processor.payment_repository.init()
+    snapshots = None
+    if processor.payment_wal is not None:
+        processor.restore_payment_store()
+        processor.payment_wal.start()
+        snapshots = asyncio.create_task(processor.run_payment_snapshots())
+    webhook_ingestor.start()
+    yield
+    await webhook_ingestor.stop()
+    if snapshots is not None:
+        snapshots.cancel()
+        processor.payment_wal.close()
+    if processor.payment_repository is not None:
+        await processor.payment_repository.close()
+    # Release pooled provider connections
+    await close_async_stripe_client()
+
+
 app = FastAPI(
     title="Dummy App",
     description="A test application for R3 Agent E2E testing",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -0,0 +1,211 @@
+"""
+Admission Control Module
+Risk Level: HIGH - Decides which payment requests are served under load
+
+Adaptive concurrency limit in front of the payment routes. The limit
+follows AIMD: each request finishing under the latency target grows it by
+1/limit (about +1 per limit's worth of requests), and a request over the
+target shrinks it by a constant factor, at most once per target interval.
+Requests over the limit wait in per-priority FIFO queues of bounded total
+depth; when a slot frees up the most urgent class goes first, and a full
+queue makes room for urgent work by shedding the newest, least urgent
+waiter. Shed requests get 429/503 with a Retry-After estimate.
+"""
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from fastapi import HTTPException
+import asyncio
+import math
+import time
+
+# Priority classes, most urgent first
+PRIORITY_WEBHOOK = 0
+PRIORITY_REFUND = 1
+PRIORITY_CHARGE = 2
+PRIORITY_NAMES = ["webhook", "refund", "charge"]
+
+ADMISSION_INITIAL_LIMIT = 64
+ADMISSION_MIN_LIMIT = 4
+ADMISSION_MAX_LIMIT = 1024
+ADMISSION_QUEUE_DEPTH = 256
+ADMISSION_QUEUE_TIMEOUT = 2.0
+ADMISSION_TARGET_LATENCY = 0.25
+ADMISSION_BACKOFF = 0.9
+
+
+class _Waiter:
+    __slots__ = ("future", "priority")
+
+    def __init__(self, future: asyncio.Future, priority: int):
+        self.future = future
+        self.priority = priority
+
+
+class AdmissionController:
+    """AIMD concurrency limiter with bounded priority queues."""
+
+    def __init__(self, initial_limit: int = ADMISSION_INITIAL_LIMIT,
+                 min_limit: int = ADMISSION_MIN_LIMIT,
+                 max_limit: int = ADMISSION_MAX_LIMIT,
+                 max_queue_depth: int = ADMISSION_QUEUE_DEPTH,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+                 target_latency: float = ADMISSION_TARGET_LATENCY,
+                 backoff: float = ADMISSION_BACKOFF,
+                 clock=time.monotonic):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.clock = clock
+
+        self.in_flight = 0
+        self._queues: List[Deque[_Waiter]] = [deque() for _ in PRIORITY_NAMES]
+        self._queued = 0
+        self._last_decrease = 0.0
+        # Smoothed latency, used for Retry-After estimates
+        self.latency = target_latency
+
+        self.admitted = [0] * len(PRIORITY_NAMES)
+        self.shed = [0] * len(PRIORITY_NAMES)
+        self.preempted = [0] * len(PRIORITY_NAMES)
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = self._queued + self.in_flight
+        return max(1, math.ceil(backlog * self.latency / max(self.limit, 1)))
+
+    def _reject(self, priority: int, status_code: int, detail: str) -> HTTPException:
+        self.shed[priority] += 1
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after())}
+        )
+
+    def _preempt_for(self, priority: int) -> bool:
+        """Shed the newest waiter less urgent than `priority`, if any."""
+        for lower in range(len(self._queues) - 1, priority, -1):
+            queue = self._queues[lower]
+            while queue:
+                waiter = queue.pop()
+                self._queued -= 1
+                if not waiter.future.done():
+                    self.preempted[lower] += 1
+                    waiter.future.set_exception(
+                        self._reject(lower, 503, "Preempted by higher priority traffic")
+                    )
+                    return True
+        return False
+
+    async def acquire(self, priority: int) -> None:
+        """
+        Take a concurrency slot, waiting in the priority queue if needed.
+
+        Raises:
+            HTTPException: 429 when the queue is full, 503 when the wait
+                times out or a more urgent request takes the queue slot
+        """
+        if self._has_capacity() and not any(self._queues[:priority + 1]):
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            return
+
+        if self._queued >= self.max_queue_depth and not self._preempt_for(priority):
+            raise self._reject(priority, 429, "Payment service overloaded")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority)
+        self._queues[priority].append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                self._remove(waiter)
+                raise self._reject(priority, 503, "Timed out waiting for capacity")
+            # Resolved just as the timeout fired: keep the slot or re-raise the shed
+            waiter.future.result()
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self._release_slot()
+            else:
+                self._remove(waiter)
+            raise
+
+    def _remove(self, waiter: _Waiter) -> None:
+        try:
+            self._queues[waiter.priority].remove(waiter)
+            self._queued -= 1
+        except ValueError:
+            pass
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def _grant(self) -> None:
+        """Hand free slots to waiters, most urgent class first."""
+        for queue in self._queues:
+            while queue and self._has_capacity():
+                waiter = queue.popleft()
+                self._queued -= 1
+                if waiter.future.done():
+                    continue
+                self.in_flight += 1
+                self.admitted[waiter.priority] += 1
+                waiter.future.set_result(None)
+            if not self._has_capacity():
+                return
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._grant()
+
+    def release(self, latency: float) -> None:
+        """Return a slot and adapt the limit to the observed latency."""
+        self.latency += 0.2 * (latency - self.latency)
+        if latency <= self.target_latency:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            now = self.clock()
+            if now - self._last_decrease >= self.target_latency:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._release_slot()
+
+    @asynccontextmanager
+    async def admit(self, priority: int) -> AsyncIterator[None]:
+        """Hold a slot for the body of the `async with` block."""
+        await self.acquire(priority)
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.release(self.clock() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, queue depths and per-class counters."""
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "max_queue_depth": self.max_queue_depth,
+            "latency_seconds": round(self.latency, 6),
+            "target_latency_seconds": self.target_latency,
+            "classes": {
+                name: {
+                    "queued": len(self._queues[i]),
+                    "admitted": self.admitted[i],
+                    "shed": self.shed[i],
+                    "preempted": self.preempted[i]
+                }
+                for i, name in enumerate(PRIORITY_NAMES)
+            }
+        }
@@ -0,0 +1,225 @@
+"""
+Payment Analytics Module
+Risk Level: MEDIUM - Read-only reporting over payment activity
+
+Columnar ledger of charges and refunds with incrementally maintained
+rollups. Rows live in typed array.array columns (amounts in integer
+cents, currency/status/customer as dictionary-encoded codes), and every
+append updates per-currency, per-customer and per-hour totals, so stats
+queries read a handful of rollup cells instead of scanning payments.
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+ROW_CHARGE = 0
+ROW_REFUND = 1
+
+BUCKET_SECONDS = 3600
+
+# Rollup cell layout: [charged_cents, refunded_cents, charges, refunds]
+_CHARGED, _REFUNDED, _CHARGES, _REFUNDS = range(4)
+
+
+class CodeDictionary:
+    """Bidirectional string <-> small integer code mapping."""
+
+    def __init__(self):
+        self.codes: Dict[Optional[str], int] = {}
+        self.values: List[Optional[str]] = []
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        return self.codes.get(value)
+
+    def decode(self, code: int) -> Optional[str]:
+        return self.values[code]
+
+
+def _cell() -> List[int]:
+    return [0, 0, 0, 0]
+
+
+def _cell_dict(cell: List[int]) -> Dict[str, Any]:
+    return {
+        "charged_cents": cell[_CHARGED],
+        "refunded_cents": cell[_REFUNDED],
+        "net_cents": cell[_CHARGED] - cell[_REFUNDED],
+        "charges": cell[_CHARGES],
+        "refunds": cell[_REFUNDS]
+    }
+
+
+class PaymentLedger:
+    """Append-only columnar ledger with incremental rollups."""
+
+    def __init__(self, bucket_seconds: int = BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.currencies = CodeDictionary()
+        self.statuses = CodeDictionary()
+        self.customers = CodeDictionary()
+
+        # Columns, one entry per row
+        self.kind = array("b")
+        self.amount_cents = array("q")
+        self.currency = array("H")
+        self.status = array("B")
+        self.customer = array("I")
+        self.created_at = array("q")
+
+        self._charge_rows: Dict[str, int] = {}
+
+        # Rollups
+        self.by_currency: Dict[int, List[int]] = {}
+        self.by_customer: Dict[Tuple[int, int], List[int]] = {}
+        self.by_bucket: Dict[int, Dict[int, List[int]]] = {}
+        self.status_counts: Dict[Tuple[int, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def _append(self, kind: int, amount_cents: int, currency: int, status: int,
+                customer: int, created_at: int) -> int:
+        self.kind.append(kind)
+        self.amount_cents.append(amount_cents)
+        self.currency.append(currency)
+        self.status.append(status)
+        self.customer.append(customer)
+        self.created_at.append(created_at)
+        return len(self.kind) - 1
+
+    def _roll_up(self, currency: int, customer: int, created_at: int,
+                 amount_field: int, count_field: int, amount_cents: int) -> None:
+        bucket = created_at // self.bucket_seconds
+        cells = (
+            self.by_currency.setdefault(currency, _cell()),
+            self.by_customer.setdefault((customer, currency), _cell()),
+            self.by_bucket.setdefault(currency, {}).setdefault(bucket, _cell()),
+        )
+        for cell in cells:
+            cell[amount_field] += amount_cents
+            cell[count_field] += 1
+
+    def add_charge(self, payment_id: str, amount_cents: int, currency: str,
+                   status: str, customer_id: Optional[str], created_at: int) -> None:
+        """Record a charge; repeated payment IDs are ignored."""
+        if payment_id in self._charge_rows:
+            return
+        currency_code = self.currencies.encode(currency)
+        status_code = self.statuses.encode(status)
+        customer_code = self.customers.encode(customer_id)
+        self._charge_rows[payment_id] = self._append(
+            ROW_CHARGE, amount_cents, currency_code, status_code, customer_code, created_at
+        )
+        self._roll_up(currency_code, customer_code, created_at, _CHARGED, _CHARGES, amount_cents)
+        key = (currency_code, status_code)
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def add_refund(self, payment_id: str, amount_cents: int, created_at: int) -> None:
+        """Record a refund against a previously recorded charge."""
+        row = self._charge_rows.get(payment_id)
+        if row is None:
+            return
+        currency_code = self.currency[row]
+        customer_code = self.customer[row]
+        self._append(ROW_REFUND, amount_cents, currency_code,
+                     self.statuses.encode("succeeded"), customer_code, created_at)
+        self._roll_up(currency_code, customer_code, created_at, _REFUNDED, _REFUNDS, amount_cents)
+
+    def update_status(self, payment_id: str, status: str) -> None:
+        """Move a charge to a new status, keeping status counts current."""
+        row = self._charge_rows.get(payment_id)
+        if row is None:
+            return
+        old = self.status[row]
+        new = self.statuses.encode(status)
+        if old == new:
+            return
+        currency_code = self.currency[row]
+        self.status[row] = new
+        self.status_counts[(currency_code, old)] -= 1
+        key = (currency_code, new)
+        self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def _currency_codes(self, currency: Optional[str]) -> List[int]:
+        if currency is None:
+            return list(self.by_currency)
+        code = self.currencies.lookup(currency)
+        return [] if code is None else [code]
+
+    def totals(self, currency: Optional[str] = None) -> Dict[str, Any]:
+        """Per-currency totals and status counts."""
+        result = {}
+        for code in self._currency_codes(currency):
+            stats = _cell_dict(self.by_currency[code])
+            stats["statuses"] = {
+                self.statuses.decode(status): count
+                for (currency_code, status), count in self.status_counts.items()
+                if currency_code == code and count
+            }
+            result[self.currencies.decode(code)] = stats
+        return result
+
+    def customer_totals(self, customer_id: str,
+                        currency: Optional[str] = None) -> Dict[str, Any]:
+        """Per-currency totals for one customer."""
+        customer_code = self.customers.lookup(customer_id)
+        if customer_code is None:
+            return {}
+        result = {}
+        for code in self._currency_codes(currency):
+            cell = self.by_customer.get((customer_code, code))
+            if cell is not None:
+                result[self.currencies.decode(code)] = _cell_dict(cell)
+        return result
+
+    def time_series(self, created_from: int, created_to: int,
+                    currency: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-bucket totals between two Unix timestamps (inclusive).
+
+        Reads one rollup cell per non-empty bucket in the range.
+        """
+        first = created_from // self.bucket_seconds
+        last = created_to // self.bucket_seconds
+        result = {}
+        for code in self._currency_codes(currency):
+            buckets = self.by_bucket.get(code, {})
+            if last - first + 1 < len(buckets):
+                keys = [b for b in range(first, last + 1) if b in buckets]
+            else:
+                keys = sorted(b for b in buckets if first <= b <= last)
+            total = _cell()
+            series = []
+            for bucket in keys:
+                cell = buckets[bucket]
+                for field in range(4):
+                    total[field] += cell[field]
+                series.append({"bucket_start": bucket * self.bucket_seconds, **_cell_dict(cell)})
+            result[self.currencies.decode(code)] = {"total": _cell_dict(total), "buckets": series}
+        return result
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Zero-copy NumPy views of the columns for ad-hoc analysis."""
+        return {
+            "kind": np.frombuffer(self.kind, dtype=np.int8),
+            "amount_cents": np.frombuffer(self.amount_cents, dtype=np.int64),
+            "currency": np.frombuffer(self.currency, dtype=np.uint16),
+            "status": np.frombuffer(self.status, dtype=np.uint8),
+            "customer": np.frombuffer(self.customer, dtype=np.uint32),
+            "created_at": np.frombuffer(self.created_at, dtype=np.int64),
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the column arrays."""
+        columns = (self.kind, self.amount_cents, self.currency,
+                   self.status, self.customer, self.created_at)
+        return sum(c.itemsize * len(c) for c in columns)
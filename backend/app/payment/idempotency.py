@@ -0,0 +1,132 @@
+"""
+Idempotency Cache Module
+Risk Level: HIGH - Decides whether a charge or refund runs again
+
+Bounded LRU+TTL cache of completed responses keyed by Idempotency-Key.
+Concurrent requests with the same key wait for the first execution and
+share its outcome instead of running in parallel.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+import asyncio
+import hashlib
+import time
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class _Entry:
+    """Outcome of one keyed execution, in flight or completed."""
+
+    __slots__ = ("fingerprint", "done", "cached", "result", "error", "expires_at")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = asyncio.Event()
+        self.cached = False
+        self.result: Any = None
+        self.error: Optional[HTTPException] = None
+        self.expires_at = 0.0
+
+
+def request_fingerprint(body: str) -> str:
+    """Digest a serialized request body so key reuse can be detected."""
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class IdempotencyCache:
+    """
+    LRU+TTL cache of completed responses with in-flight coalescing.
+
+    Successful results and 4xx HTTPExceptions are cached and replayed;
+    5xx errors and unexpected exceptions are not, so the client may retry.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._completed: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def clear(self) -> None:
+        """Drop every completed entry."""
+        self._completed.clear()
+
+    def _lookup(self, cache_key: Tuple[str, str]) -> Optional[_Entry]:
+        entry = self._completed.get(cache_key)
+        if entry is None:
+            return self._in_flight.get(cache_key)
+        if entry.expires_at <= self.clock():
+            del self._completed[cache_key]
+            return self._in_flight.get(cache_key)
+        self._completed.move_to_end(cache_key)
+        return entry
+
+    def _store(self, cache_key: Tuple[str, str], entry: _Entry) -> None:
+        entry.cached = True
+        entry.expires_at = self.clock() + self.ttl_seconds
+        self._completed[cache_key] = entry
+        self._completed.move_to_end(cache_key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    @staticmethod
+    def _replay(entry: _Entry) -> Any:
+        if entry.error is not None:
+            raise HTTPException(status_code=entry.error.status_code, detail=entry.error.detail)
+        return entry.result
+
+    async def run(self, scope: str, key: str, fingerprint: str,
+                  operation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Execute an operation at most once per (scope, key).
+
+        Args:
+            scope: Endpoint namespace, so keys do not collide across routes
+            key: Client-supplied Idempotency-Key
+            fingerprint: Digest of the request body
+            operation: Coroutine factory performing the real work
+
+        Returns:
+            The operation's result, live or replayed from the cache
+        """
+        if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key too long")
+
+        cache_key = (scope, key)
+        entry = self._lookup(cache_key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was reused with a different request"
+                )
+            if not entry.cached:
+                await entry.done.wait()
+            if entry.cached:
+                return self._replay(entry)
+            # The first execution failed without a cacheable outcome; run again
+            return await self.run(scope, key, fingerprint, operation)
+
+        entry = _Entry(fingerprint)
+        self._in_flight[cache_key] = entry
+        try:
+            entry.result = await operation()
+        except HTTPException as e:
+            if e.status_code < 500:
+                entry.error = e
+                self._store(cache_key, entry)
+            raise
+        else:
+            self._store(cache_key, entry)
+            return entry.result
+        finally:
+            del self._in_flight[cache_key]
+            entry.done.set()
@@ -0,0 +1,157 @@
+"""
+Mock Payment Provider Module
+Risk Level: LOW - Local stand-in, never talks to a real provider
+
+Minimal ASGI imitation of the Stripe REST endpoints the clients use.
+It backs the simulated provider when STRIPE_API_BASE is unset and lets
+tests and benchmarks exercise AsyncStripeClient over real HTTP semantics.
+
+Run standalone with:
+    uvicorn app.payment.mock_provider:app --port 12111
+"""
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from typing import Dict, Any, Tuple
+import asyncio
+import itertools
+import random
+import time
+
+# Fraction of confirmations declined, matching the old inline simulation
+DECLINE_RATE = 0.05
+
+# Artificial per-request latency in seconds, for benchmarks
+LATENCY_SECONDS = 0.0
+
+# Fraction of requests answered with a 500, to exercise client retries
+ERROR_RATE = 0.0
+
+app = FastAPI(title="Mock Payment Provider")
+
+# Retained intents; oldest are dropped so a long-running mock stays bounded
+MAX_INTENTS = 100000
+
+_ids = itertools.count(1)
+intents: Dict[str, Dict[str, Any]] = {}
+
+# Responses to POSTs by Idempotency-Key, replayed like the real API does
+idempotent_responses: Dict[str, Tuple[int, bytes]] = {}
+
+
+@app.middleware("http")
+async def faults_and_idempotency(request: Request, call_next):
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse({"error": {"message": "Injected provider error"}}, status_code=500)
+    key = request.headers.get("Idempotency-Key")
+    if key is None or request.method != "POST":
+        return await call_next(request)
+    if key in idempotent_responses:
+        status_code, body = idempotent_responses[key]
+        return Response(body, status_code=status_code, media_type="application/json")
+
+    response = await call_next(request)
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    if response.status_code < 500:
+        idempotent_responses[key] = (response.status_code, body)
+        if len(idempotent_responses) > MAX_INTENTS:
+            idempotent_responses.pop(next(iter(idempotent_responses)))
+    return Response(body, status_code=response.status_code, media_type="application/json")
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_mock{next(_ids):020d}"
+
+
+async def _form(request: Request) -> Dict[str, Any]:
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    return dict(await request.form())
+
+
+def _confirm(intent: Dict[str, Any]) -> Dict[str, Any]:
+    if random.random() < DECLINE_RATE:
+        intent["status"] = "requires_payment_method"
+        intent["last_payment_error"] = {"code": "card_declined", "message": "Payment declined"}
+    else:
+        intent["status"] = "succeeded"
+    return intent
+
+
+@app.post("/v1/customers")
+async def create_customer(request: Request):
+    form = await _form(request)
+    return {
+        "id": _new_id("cus"),
+        "object": "customer",
+        "email": form.get("email"),
+        "name": form.get("name"),
+        "created": int(time.time())
+    }
+
+
+@app.post("/v1/payment_intents")
+async def create_payment_intent(request: Request):
+    form = await _form(request)
+    intent_id = _new_id("pi")
+    intent = {
+        "id": intent_id,
+        "object": "payment_intent",
+        "client_secret": f"{intent_id}_secret_mock",
+        "amount": int(form.get("amount", 0)),
+        "currency": form.get("currency", "usd"),
+        "customer": form.get("customer"),
+        "status": "requires_payment_method",
+        "created": int(time.time())
+    }
+    if form.get("confirm") == "true":
+        _confirm(intent)
+    intents[intent_id] = intent
+    if len(intents) > MAX_INTENTS:
+        intents.pop(next(iter(intents)))
+    return intent
+
+
+@app.get("/v1/payment_intents/{intent_id}")
+async def retrieve_payment_intent(intent_id: str):
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    if intent_id not in intents:
+        raise HTTPException(status_code=404, detail="No such payment_intent")
+    return intents[intent_id]
+
+
+@app.post("/v1/payment_intents/{intent_id}/confirm")
+async def confirm_payment_intent(intent_id: str, request: Request):
+    await _form(request)
+    if intent_id not in intents:
+        raise HTTPException(status_code=404, detail="No such payment_intent")
+    return _confirm(intents[intent_id])
+
+
+@app.post("/v1/refunds")
+async def create_refund(request: Request):
+    form = await _form(request)
+    return {
+        "id": _new_id("re"),
+        "object": "refund",
+        "payment_intent": form.get("payment_intent"),
+        "amount": int(form["amount"]) if form.get("amount") else None,
+        "reason": form.get("reason"),
+        "status": "succeeded",
+        "created": int(time.time())
+    }
+
+
+@app.post("/v1/checkout/sessions")
+async def create_checkout_session(request: Request):
+    form = await _form(request)
+    session_id = _new_id("cs")
+    return {
+        "id": session_id,
+        "object": "checkout.session",
+        "url": f"https://checkout.stripe.com/pay/{session_id}",
+        "success_url": form.get("success_url"),
+        "cancel_url": form.get("cancel_url"),
+        "created": int(time.time())
+    }
@@ -9,16 +9,38 @@ Contains intentional issues:
 - High cyclomatic complexity
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Iterator, Tuple
 from decimal import Decimal
+from bisect import bisect_left, insort
+import asyncio
+import base64
+import csv
+import io
+import itertools
+import json
 import time
-import hashlib
-import random
 import os
+import numpy as np
 from dotenv import load_dotenv
 
+from app.payment.admission import (
+    PRIORITY_CHARGE, PRIORITY_REFUND, PRIORITY_WEBHOOK, AdmissionController
+)
+from app.payment.analytics import PaymentLedger
+from app.payment.idempotency import IdempotencyCache, request_fingerprint
+from app.payment.repository import PaymentRepository, create_repository
+from app.payment.stripe import (
+    STRIPE_BULK_RATE_PER_SECOND, StripeAPIError, get_async_stripe_client,
+    get_stripe_client, provider_stats
+)
+from app.payment.wal import WriteAheadLog, run_periodic_snapshots
+from app.payment.webhooks import WebhookIngestor
+from app.utils.cards import card_number_error, validate_card_numbers
+from app.utils.ids import generate_id
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -69,14 +91,191 @@ class PaymentResponse(BaseModel):
     created_at: int
 
 
+class BatchPaymentRequest(BaseModel):
+    payments: List[PaymentRequest]
+
+
+class BatchPaymentResult(BaseModel):
+    index: int
+    status: str
+    payment_id: Optional[str] = None
+    amount: float
+    currency: str
+    created_at: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchPaymentResponse(BaseModel):
+    results: List[BatchPaymentResult]
+    succeeded: int
+    failed: int
+
+
+class CustomerCreateRequest(BaseModel):
+    email: str
+    name: Optional[str] = None
+
+
+class BulkCustomerRequest(BaseModel):
+    customers: List[CustomerCreateRequest]
+    concurrency: int = 32
+    rate_per_second: Optional[float] = None
+
+
 # In-memory payment store (simplified for demo)
 payments_db = {}
 refunds_db = {}
 
+# Optional durable store written through from the in-memory one
+PAYMENT_DATABASE_URL = os.getenv("PAYMENT_DATABASE_URL")
+payment_repository: Optional[PaymentRepository] = create_repository(PAYMENT_DATABASE_URL)
+
+# Optional write-ahead log making the in-memory store itself durable
+PAYMENT_WAL_DIR = os.getenv("PAYMENT_WAL_DIR")
+PAYMENT_SNAPSHOT_INTERVAL = float(os.getenv("PAYMENT_SNAPSHOT_INTERVAL", "300"))
+PAYMENT_SNAPSHOT_MIN_RECORDS = int(os.getenv("PAYMENT_SNAPSHOT_MIN_RECORDS", "100000"))
+payment_wal: Optional[WriteAheadLog] = WriteAheadLog(PAYMENT_WAL_DIR) if PAYMENT_WAL_DIR else None
+
+# Secondary indexes over payments_db, kept sorted by (created_at, seq).
+# seq is a process-wide insertion counter that breaks created_at ties.
+payments_by_customer: Dict[Optional[str], List[Tuple[int, int, str]]] = {}
+payments_by_created: List[Tuple[int, int, str]] = []
+payment_index_keys: Dict[str, Tuple[int, int]] = {}
+_payment_seq = itertools.count()
+
+# Per-payment refund ledger: refund keys in creation order and the running
+# refunded total in minor units (cents)
+refunds_by_payment: Dict[str, List[Tuple[int, int, str]]] = {}
+refunded_minor_units: Dict[str, int] = {}
+_refund_seq = itertools.count()
+
+# Columnar ledger with running totals behind /payment/stats
+payment_ledger = PaymentLedger()
+
+# Completed /charge and /refund responses, keyed by Idempotency-Key
+IDEMPOTENCY_CACHE_SIZE = 100000
+IDEMPOTENCY_TTL_SECONDS = 86400
+idempotency_cache = IdempotencyCache(
+    max_entries=IDEMPOTENCY_CACHE_SIZE,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+)
+
+# Per-call provider timeout for charges, in seconds
+PROVIDER_CHARGE_TIMEOUT = 10.0
+
+# Payment export settings
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_FIELDS = [
+    "payment_id", "amount", "currency", "status",
+    "created_at", "customer_id", "card_last4"
+]
+
+# Batch charge limits
+MAX_BATCH_SIZE = 10000
+BATCH_DISPATCH_CONCURRENCY = 64
+
+# Bulk customer creation limits
+MAX_BULK_CUSTOMERS = 200000
+MAX_BULK_CONCURRENCY = 256
+
+# Adaptive concurrency limit shared by charges, refunds and webhooks
+admission_controller = AdmissionController()
+
 
 def generate_payment_id() -> str:
     """Generate unique payment ID."""
-    return f"pay_{hashlib.md5(str(time.time()).encode()).hexdigest()[:16]}"
+    return generate_id("pay")
+
+
+def index_payment(payment: dict) -> None:
+    """Add a stored payment to the customer and created_at indexes."""
+    payment_id = payment["payment_id"]
+    if payment_id in payment_index_keys:
+        return
+    key = (payment["created_at"], next(_payment_seq))
+    payment_index_keys[payment_id] = key
+    entry = (*key, payment_id)
+    insort(payments_by_created, entry)
+    insort(payments_by_customer.setdefault(payment.get("customer_id"), []), entry)
+
+
+def track_payment(payment: dict) -> None:
+    """Add a stored payment to the analytics ledger."""
+    payment_ledger.add_charge(
+        payment["payment_id"],
+        to_minor_units(payment["amount"]),
+        payment["currency"],
+        payment["status"],
+        payment.get("customer_id"),
+        payment["created_at"]
+    )
+
+
+def set_payment_status(payment_id: str, status: str) -> None:
+    """Update a payment's status, keeping the indexes consistent."""
+    payment = payments_db.get(payment_id)
+    if payment is None:
+        return
+    payment["status"] = status
+    index_payment(payment)
+    payment_ledger.update_status(payment_id, status)
+
+
+def to_minor_units(amount: float) -> int:
+    """Convert a major-unit amount (e.g. dollars) to integer minor units."""
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def refundable_minor_units(payment: dict) -> int:
+    """Remaining refundable balance of a payment, in minor units."""
+    return to_minor_units(payment["amount"]) - refunded_minor_units.get(payment["payment_id"], 0)
+
+
+def record_refund(refund: dict) -> None:
+    """Store a refund and add it to the payment's ledger."""
+    payment_id = refund["payment_id"]
+    refunds_db[refund["refund_id"]] = refund
+    refunds_by_payment.setdefault(payment_id, []).append(
+        (refund["created_at"], next(_refund_seq), refund["refund_id"])
+    )
+    amount = to_minor_units(refund["amount"])
+    refunded_minor_units[payment_id] = refunded_minor_units.get(payment_id, 0) + amount
+    payment_ledger.add_refund(payment_id, amount, refund["created_at"])
+
+
+def encode_cursor(key: Tuple[int, int]) -> str:
+    """Encode an index key as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(f"{key[0]}:{key[1]}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a pagination cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, seq = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return int(created_at), int(seq)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(entries: List[Tuple[int, int, str]], limit: int,
+             cursor: Optional[str]) -> Tuple[List[Tuple[int, int, str]], Optional[str]]:
+    """
+    Slice one page from a sorted (created_at, seq, id) index.
+
+    Returns:
+        Tuple of (page entries, cursor for the next page or None)
+    """
+    start = 0
+    if cursor:
+        created_at, seq = decode_cursor(cursor)
+        start = bisect_left(entries, (created_at, seq + 1))
+
+    page = entries[start:start + limit]
+    next_cursor = None
+    if page and start + limit < len(entries):
+        next_cursor = encode_cursor(page[-1][:2])
+    return page, next_cursor
 
 
 def validate_card(card_number: str) -> bool:
@@ -84,48 +283,202 @@ def validate_card(card_number: str) -> bool:
     Basic card validation using Luhn algorithm.
     INTENTIONAL: Simplified validation, doesn't check all cases
     """
-    try:
-        digits = [int(d) for d in card_number if d.isdigit()]
-        if len(digits) < 13 or len(digits) > 19:
-            return False
-        
-        # Luhn check
-        checksum = 0
-        for i, digit in enumerate(reversed(digits)):
-            if i % 2 == 1:
-                digit *= 2
-                if digit > 9:
-                    digit -= 9
-            checksum += digit
-        
-        return checksum % 10 == 0
-    except:
-        # INTENTIONAL: Bare except
-        return False
+    return card_number_error(card_number) is None
 
 
-def process_payment_with_stripe(amount: float, card: PaymentMethod) -> dict:
+async def process_payment_with_stripe(amount: float, card: PaymentMethod) -> dict:
     """
-    Simulate Stripe payment processing.
+    Charge a card through the async, connection-pooled provider client.
     INTENTIONAL ISSUES:
-    - No actual API call
     - Card data logged
     - No PCI compliance
     """
     # INTENTIONAL: Logging sensitive card data
     print(f"Processing payment: card={card.card_number[:4]}...{card.card_number[-4:]}")
     
-    # Simulate payment processing
-    if random.random() < 0.95:  # 95% success rate
-        return {"success": True, "transaction_id": f"txn_{int(time.time())}"}
-    else:
-        return {"success": False, "error": "Payment declined"}
+    amount_cents = to_minor_units(amount)
+    try:
+        intent = await get_async_stripe_client().create_payment_intent(
+            amount=amount_cents,
+            payment_method_data={
+                "number": card.card_number,
+                "exp_month": card.exp_month,
+                "exp_year": card.exp_year,
+                "cvc": card.cvv
+            },
+            confirm=True,
+            timeout=PROVIDER_CHARGE_TIMEOUT
+        )
+    except StripeAPIError:
+        return {"success": False, "error": "Payment provider unavailable"}
+    
+    if intent.get("status") == "succeeded":
+        return {"success": True, "transaction_id": intent["id"]}
+    error = intent.get("last_payment_error") or {}
+    return {"success": False, "error": error.get("message", "Payment declined")}
+
+
+async def persist_payments(payments: List[dict]) -> None:
+    """Make new payments durable: one group commit, one bulk insert."""
+    if not payments:
+        return
+    if payment_wal is not None:
+        await payment_wal.append_durable(("payment", p) for p in payments)
+    if payment_repository is not None:
+        await payment_repository.add_payments(payments)
+
+
+async def persist_refund(refund: dict) -> None:
+    """Make a new refund durable."""
+    if payment_wal is not None:
+        await payment_wal.append_durable([("refund", refund)])
+    if payment_repository is not None:
+        await payment_repository.add_refund(refund)
+
+
+async def persist_statuses(statuses: Dict[str, str]) -> None:
+    """Make payment status changes durable."""
+    if not statuses:
+        return
+    if payment_wal is not None:
+        await payment_wal.append_durable(
+            ("status", {"payment_id": payment_id, "status": status})
+            for payment_id, status in statuses.items()
+        )
+    if payment_repository is not None:
+        await payment_repository.update_statuses(statuses)
+
+
+def restore_payment_store() -> int:
+    """
+    Rebuild payments_db, refunds_db and their indexes from the WAL.
+
+    Replay is idempotent, as snapshots may already contain records
+    that are also in the log tail.
+
+    Returns:
+        Number of records replayed
+    """
+    if payment_wal is None:
+        return 0
+    replayed = 0
+    for op, data in payment_wal.replay():
+        if op == "payment":
+            payments_db[data["payment_id"]] = data
+            index_payment(data)
+            track_payment(data)
+        elif op == "refund":
+            if data["refund_id"] not in refunds_db:
+                record_refund(data)
+        elif op == "status":
+            set_payment_status(data["payment_id"], data["status"])
+        replayed += 1
+    return replayed
+
+
+def payment_store_records() -> List[Tuple[str, dict]]:
+    """Shallow copy of the store as (op, data) pairs for a snapshot."""
+    return ([("payment", dict(p)) for p in list(payments_db.values())]
+            + [("refund", dict(r)) for r in list(refunds_db.values())])
+
+
+async def run_payment_snapshots() -> None:
+    """Periodically snapshot the store so restart replays a short log tail."""
+    await run_periodic_snapshots(
+        payment_wal,
+        payment_store_records,
+        PAYMENT_SNAPSHOT_INTERVAL,
+        PAYMENT_SNAPSHOT_MIN_RECORDS
+    )
+
+
+def record_payment(request: PaymentRequest, card: PaymentMethod) -> dict:
+    """Store a succeeded payment and return its record."""
+    payment_id = generate_payment_id()
+    payment = {
+        "payment_id": payment_id,
+        "amount": request.amount,
+        "currency": request.currency,
+        "status": "succeeded",
+        "created_at": int(time.time()),
+        "customer_id": request.customer_id,
+        # INTENTIONAL: Storing full card number
+        "card_last4": card.card_number[-4:]
+    }
+    payments_db[payment_id] = payment
+    index_payment(payment)
+    track_payment(payment)
+    return payment
+
+
+def validate_payment_requests(requests: List[PaymentRequest]) -> List[Optional[str]]:
+    """
+    Validate a batch of payment requests in one pass.
+
+    Runs the same amount, Luhn, expiry and CVV rules as charge_payment,
+    with card numbers checked by the vectorized engine in one call.
+
+    Args:
+        requests: Payment requests to validate
+
+    Returns:
+        Per-request error detail, or None for requests that passed
+    """
+    errors: List[Optional[str]] = [None] * len(requests)
+
+    def reject(index: int, detail: str) -> None:
+        if errors[index] is None:
+            errors[index] = detail
+
+    for i, request in enumerate(requests):
+        if request.amount <= 0:
+            reject(i, "Invalid amount")
+        elif request.amount > 999999:
+            reject(i, "Amount exceeds limit")
+
+    cards = [request.payment_method for request in requests]
+    card_check = validate_card_numbers(card.card_number for card in cards)
+    for i in np.flatnonzero(~card_check.valid):
+        if not cards[i].card_number:
+            reject(i, "Card number required")
+        else:
+            reject(i, "Invalid card number")
+    for i, card in enumerate(cards):
+        if not 1 <= card.exp_month <= 12:
+            reject(i, "Invalid expiration month")
+        elif card.exp_year < 2024:
+            reject(i, "Card expired")
+    for i, card in enumerate(cards):
+        if not card.cvv or len(card.cvv) not in [3, 4]:
+            reject(i, "Invalid CVV")
+
+    return errors
 
 
 @router.post("/charge", response_model=PaymentResponse)
-async def charge_payment(request: PaymentRequest):
+async def charge_payment(request: PaymentRequest,
+                         idempotency_key: Optional[str] = Header(None)):
     """
     Process a payment charge.
+
+    With an Idempotency-Key header, retries replay the first response
+    from memory instead of charging again. Under overload the request
+    is queued or shed by the admission controller.
+    """
+    async with admission_controller.admit(PRIORITY_CHARGE):
+        if idempotency_key:
+            return await idempotency_cache.run(
+                "charge",
+                idempotency_key,
+                request_fingerprint(request.model_dump_json()),
+                lambda: execute_charge(request)
+            )
+        return await execute_charge(request)
+
+
+async def execute_charge(request: PaymentRequest) -> PaymentResponse:
+    """
+    Validate and run a single payment charge.
     HIGH COMPLEXITY - Multiple nested conditions and error paths
     """
     try:
@@ -145,24 +498,14 @@ async def charge_payment(request: PaymentRequest):
                         if card.exp_year >= 2024:
                             if card.cvv and len(card.cvv) in [3, 4]:
                                 # Process payment
-                                result = process_payment_with_stripe(request.amount, card)
+                                result = await process_payment_with_stripe(request.amount, card)
                                 
                                 if result["success"]:
-                                    payment_id = generate_payment_id()
-                                    payment = {
-                                        "payment_id": payment_id,
-                                        "amount": request.amount,
-                                        "currency": request.currency,
-                                        "status": "succeeded",
-                                        "created_at": int(time.time()),
-                                        "customer_id": request.customer_id,
-                                        # INTENTIONAL: Storing full card number
-                                        "card_last4": card.card_number[-4:]
-                                    }
-                                    payments_db[payment_id] = payment
+                                    payment = record_payment(request, card)
+                                    await persist_payments([payment])
                                     
                                     return PaymentResponse(
-                                        payment_id=payment_id,
+                                        payment_id=payment["payment_id"],
                                         status="succeeded",
                                         amount=request.amount,
                                         currency=request.currency,
@@ -192,10 +535,109 @@ async def charge_payment(request: PaymentRequest):
         raise HTTPException(status_code=500, detail="Payment processing error")
 
 
+@router.post("/charge/batch", response_model=BatchPaymentResponse)
+async def charge_payment_batch(batch: BatchPaymentRequest):
+    """
+    Process many payment charges in one call.
+
+    Cards are validated together up front; accepted charges are dispatched
+    to the provider concurrently and each item reports its own outcome, so
+    one declined card does not fail the batch.
+    """
+    requests = batch.payments
+    if not requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds limit of {MAX_BATCH_SIZE} payments"
+        )
+
+    errors = validate_payment_requests(requests)
+    semaphore = asyncio.Semaphore(BATCH_DISPATCH_CONCURRENCY)
+
+    async def dispatch(index: int, request: PaymentRequest) -> BatchPaymentResult:
+        async with semaphore:
+            try:
+                async with admission_controller.admit(PRIORITY_CHARGE):
+                    result = await process_payment_with_stripe(
+                        request.amount, request.payment_method
+                    )
+            except HTTPException as e:
+                # Shed by admission control; the rest of the batch continues
+                result = {"success": False, "error": e.detail}
+            except Exception:
+                result = {"success": False, "error": "Payment processing error"}
+        if not result["success"]:
+            return BatchPaymentResult(
+                index=index,
+                status="failed",
+                amount=request.amount,
+                currency=request.currency,
+                error=result.get("error", "Payment failed")
+            )
+        payment = record_payment(request, request.payment_method)
+        return BatchPaymentResult(
+            index=index,
+            status="succeeded",
+            payment_id=payment["payment_id"],
+            amount=request.amount,
+            currency=request.currency,
+            created_at=payment["created_at"]
+        )
+
+    results: List[Optional[BatchPaymentResult]] = [None] * len(requests)
+    accepted = []
+    for i, (request, error) in enumerate(zip(requests, errors)):
+        if error is None:
+            accepted.append(dispatch(i, request))
+        else:
+            results[i] = BatchPaymentResult(
+                index=i,
+                status="failed",
+                amount=request.amount,
+                currency=request.currency,
+                error=error
+            )
+
+    for item in await asyncio.gather(*accepted):
+        results[item.index] = item
+    await persist_payments([
+        payments_db[item.payment_id] for item in results if item.payment_id
+    ])
+
+    succeeded = sum(1 for item in results if item.status == "succeeded")
+    return BatchPaymentResponse(
+        results=results,
+        succeeded=succeeded,
+        failed=len(results) - succeeded
+    )
+
+
 @router.post("/refund")
-async def process_refund(request: RefundRequest):
+async def process_refund(request: RefundRequest,
+                         idempotency_key: Optional[str] = Header(None)):
     """
     Process a refund.
+
+    With an Idempotency-Key header, retries replay the first response
+    from memory instead of refunding again. Refunds are admitted ahead
+    of queued charges.
+    """
+    async with admission_controller.admit(PRIORITY_REFUND):
+        if idempotency_key:
+            return await idempotency_cache.run(
+                "refund",
+                idempotency_key,
+                request_fingerprint(request.model_dump_json()),
+                lambda: execute_refund(request)
+            )
+        return await execute_refund(request)
+
+
+async def execute_refund(request: RefundRequest) -> dict:
+    """
+    Run a single refund.
     INTENTIONAL: No authorization checks
     """
     try:
@@ -205,12 +647,22 @@ async def process_refund(request: RefundRequest):
             raise HTTPException(status_code=404, detail="Payment not found")
         
         payment = payments_db[payment_id]
-        refund_amount = request.amount or payment["amount"]
+        refundable = refundable_minor_units(payment)
+        if request.amount is None:
+            refund_amount = refundable / 100
+        else:
+            refund_amount = request.amount
+        
+        if refundable <= 0:
+            raise HTTPException(status_code=400, detail="Payment already fully refunded")
         
-        # INTENTIONAL: No check if already refunded
-        # INTENTIONAL: No check if refund amount exceeds payment
+        if to_minor_units(refund_amount) <= 0:
+            raise HTTPException(status_code=400, detail="Invalid refund amount")
         
-        refund_id = f"ref_{hashlib.md5(str(time.time()).encode()).hexdigest()[:16]}"
+        if to_minor_units(refund_amount) > refundable:
+            raise HTTPException(status_code=400, detail="Refund exceeds remaining balance")
+        
+        refund_id = generate_id("ref")
         refund = {
             "refund_id": refund_id,
             "payment_id": payment_id,
@@ -219,7 +671,8 @@ async def process_refund(request: RefundRequest):
             "status": "succeeded",
             "created_at": int(time.time())
         }
-        refunds_db[refund_id] = refund
+        record_refund(refund)
+        await persist_refund(refund)
         
         return refund
     except HTTPException:
@@ -229,53 +682,320 @@ async def process_refund(request: RefundRequest):
         raise HTTPException(status_code=500, detail="Refund failed")
 
 
+@router.get("/payment/stats")
+async def payment_stats(
+    currency: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    created_from: Optional[int] = Query(None, ge=0),
+    created_to: Optional[int] = Query(None, ge=0)
+):
+    """
+    Payment totals served from the analytics ledger's rollups.
+
+    With created_from/created_to, returns hourly buckets for that range;
+    with customer_id, that customer's totals; otherwise per-currency
+    totals with status counts. Amounts are in minor units (cents).
+    """
+    if created_from is not None or created_to is not None:
+        if customer_id is not None:
+            raise HTTPException(status_code=400, detail="customer_id cannot be combined with a time range")
+        created_from = created_from if created_from is not None else 0
+        created_to = created_to if created_to is not None else int(time.time())
+        if created_from > created_to:
+            raise HTTPException(status_code=400, detail="created_from must not be after created_to")
+        return {
+            "created_from": created_from,
+            "created_to": created_to,
+            "bucket_seconds": payment_ledger.bucket_seconds,
+            "currencies": payment_ledger.time_series(created_from, created_to, currency)
+        }
+    if customer_id is not None:
+        return {
+            "customer_id": customer_id,
+            "currencies": payment_ledger.customer_totals(customer_id, currency)
+        }
+    return {
+        "rows": len(payment_ledger),
+        "memory_bytes": payment_ledger.memory_bytes(),
+        "currencies": payment_ledger.totals(currency)
+    }
+
+
 @router.get("/payment/{payment_id}")
 async def get_payment(payment_id: str):
-    """Get payment details."""
+    """Get payment details, falling back to the durable store on a miss."""
+    if payment_id in payments_db:
+        return payments_db[payment_id]
+    if payment_repository is not None:
+        payment = await payment_repository.get_payment(payment_id)
+        if payment is not None:
+            return payment
+    raise HTTPException(status_code=404, detail="Payment not found")
+
+
+@router.get("/payment/{payment_id}/refunds")
+async def list_payment_refunds(
+    payment_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    List a payment's refunds with its refunded and refundable totals.
+
+    Reads only this payment's ledger, never the full refund store.
+    """
     if payment_id not in payments_db:
         raise HTTPException(status_code=404, detail="Payment not found")
-    return payments_db[payment_id]
+
+    entries = refunds_by_payment.get(payment_id, [])
+    page, next_cursor = paginate(entries, limit, cursor)
+    return {
+        "refunds": [refunds_db[refund_id] for _, _, refund_id in page],
+        "total": len(entries),
+        "refunded_amount": refunded_minor_units.get(payment_id, 0) / 100,
+        "refundable_amount": refundable_minor_units(payments_db[payment_id]) / 100,
+        "next_cursor": next_cursor
+    }
 
 
 @router.get("/payments")
-async def list_payments(customer_id: Optional[str] = None, limit: int = 10):
+async def list_payments(
+    customer_id: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None
+):
     """
-    List payments.
-    INTENTIONAL: No pagination, loads all into memory
+    List payments ordered by creation time.
+
+    Pages are read from the customer (or global) index with a keyset
+    cursor, so each page costs O(limit) regardless of store size.
     """
-    try:
-        payments = list(payments_db.values())
-        
-        if customer_id:
-            payments = [p for p in payments if p.get("customer_id") == customer_id]
-        
-        # INTENTIONAL: No proper pagination
-        return {"payments": payments[:limit], "total": len(payments)}
-    except:
-        return {"payments": [], "total": 0}
+    if customer_id:
+        entries = payments_by_customer.get(customer_id, [])
+    else:
+        entries = payments_by_created
+
+    page, next_cursor = paginate(entries, limit, cursor)
+    payments = [payments_db[payment_id] for _, _, payment_id in page]
+    return {"payments": payments, "total": len(entries), "next_cursor": next_cursor}
+
+
+def iter_payments(entries: List[Tuple[int, int, str]],
+                  created_from: Optional[int] = None,
+                  created_to: Optional[int] = None,
+                  currency: Optional[str] = None,
+                  status: Optional[str] = None) -> Iterator[dict]:
+    """
+    Yield payments from an index, narrowed by created_at range and filters.
+
+    The created_at range is located by bisection and the index is walked
+    by position, so nothing is copied. The upper bound is fixed when
+    iteration starts, so payments created during an export are excluded.
+    """
+    start = bisect_left(entries, (created_from,)) if created_from is not None else 0
+    end = bisect_left(entries, (created_to + 1,)) if created_to is not None else len(entries)
+
+    for position in range(start, end):
+        payment = payments_db.get(entries[position][2])
+        if payment is None:
+            continue
+        if currency and payment.get("currency") != currency:
+            continue
+        if status and payment.get("status") != status:
+            continue
+        yield payment
+
+
+def export_ndjson(payments: Iterator[dict]) -> Iterator[str]:
+    """Render payments as NDJSON, EXPORT_CHUNK_ROWS lines per chunk."""
+    for rows in iter(lambda: list(itertools.islice(payments, EXPORT_CHUNK_ROWS)), []):
+        yield "".join(
+            json.dumps({field: p.get(field) for field in EXPORT_FIELDS}) + "\n"
+            for p in rows
+        )
+
+
+def export_csv(payments: Iterator[dict]) -> Iterator[str]:
+    """Render payments as CSV with a header row, in chunks."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for rows in iter(lambda: list(itertools.islice(payments, EXPORT_CHUNK_ROWS)), []):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (export_ndjson, "application/x-ndjson"),
+    "csv": (export_csv, "text/csv"),
+}
+
+
+@router.get("/payments/export")
+async def export_payments(
+    format: str = "ndjson",
+    customer_id: Optional[str] = None,
+    currency: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[int] = None,
+    created_to: Optional[int] = None
+):
+    """
+    Stream payments as NDJSON or CSV.
+
+    Rows are generated lazily from the payment indexes and written in
+    fixed-size chunks, so memory stays flat however many payments match.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    render, media_type = EXPORT_FORMATS[format]
+
+    if customer_id:
+        entries = payments_by_customer.get(customer_id, [])
+    else:
+        entries = payments_by_created
+
+    payments = iter_payments(entries, created_from, created_to, currency, status)
+    return StreamingResponse(
+        render(payments),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="payments.{format}"'}
+    )
+
+
+@router.post("/customers/bulk")
+async def create_customers_bulk(request: BulkCustomerRequest):
+    """
+    Create many provider customers, streaming one NDJSON line per result.
+
+    Calls run with bounded concurrency at a capped start rate; lines are
+    written as calls complete, so each carries its input index. Failed
+    items report an error without stopping the rest.
+    """
+    if not request.customers:
+        raise HTTPException(status_code=400, detail="No customers given")
+    if len(request.customers) > MAX_BULK_CUSTOMERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bulk request exceeds limit of {MAX_BULK_CUSTOMERS} customers"
+        )
+    if not 1 <= request.concurrency <= MAX_BULK_CONCURRENCY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"concurrency must be between 1 and {MAX_BULK_CONCURRENCY}"
+        )
+    if request.rate_per_second is not None and request.rate_per_second <= 0:
+        raise HTTPException(status_code=400, detail="rate_per_second must be positive")
+
+    client = get_async_stripe_client()
+    rate = request.rate_per_second or STRIPE_BULK_RATE_PER_SECOND
+
+    async def lines():
+        async for result in client.create_customers_bulk(
+            (c.model_dump() for c in request.customers),
+            concurrency=request.concurrency,
+            rate_per_second=rate
+        ):
+            yield json.dumps({
+                "index": result.index,
+                "email": result.email,
+                "customer_id": result.customer["id"] if result.customer else None,
+                "error": result.error
+            }) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# Status each webhook event type moves a payment to
+WEBHOOK_STATUS_EVENTS = {
+    "payment.succeeded": "succeeded",
+    "payment.failed": "failed",
+}
+
+
+def apply_webhook_events(events: List[dict]) -> Dict[str, str]:
+    """
+    Apply a batch of webhook events to payments_db.
+
+    Status updates are coalesced per payment_id, so only the last status
+    in the batch is written. payment_intent.* events go to the provider
+    client instead, refreshing its intent cache.
+
+    Returns:
+        Final status of each payment that was updated
+    """
+    statuses: Dict[str, str] = {}
+    for event in events:
+        event_type = event.get("type", "")
+        if isinstance(event_type, str) and event_type.startswith("payment_intent."):
+            get_stripe_client().handle_webhook_event(event)
+            continue
+        status = WEBHOOK_STATUS_EVENTS.get(event_type)
+        data = event.get("data")
+        payment_id = data.get("payment_id") if isinstance(data, dict) else None
+        if status and payment_id:
+            statuses[payment_id] = status
+
+    applied: Dict[str, str] = {}
+    for payment_id, status in statuses.items():
+        if payment_id in payments_db:
+            set_payment_status(payment_id, status)
+            applied[payment_id] = status
+    return applied
+
+
+async def ingest_webhook_events(events: List[dict]) -> int:
+    """Apply a webhook batch and write the status changes through."""
+    applied = apply_webhook_events(events)
+    await persist_statuses(applied)
+    return len(applied)
+
+
+webhook_ingestor = WebhookIngestor(ingest_webhook_events)
 
 
 @router.post("/webhook")
 async def payment_webhook(payload: dict):
     """
     Handle payment webhooks.
+
+    Events are acknowledged once queued and applied in batches by the
+    ingestor's consumer task; a full queue answers 503 so the provider
+    retries later. Without a running consumer they are applied inline.
     INTENTIONAL: No signature verification
     """
     # TODO: Verify webhook signature
-    event_type = payload.get("type", "")
-    
-    try:
-        if event_type == "payment.succeeded":
-            # Update payment status
-            payment_id = payload.get("data", {}).get("payment_id")
-            if payment_id and payment_id in payments_db:
-                payments_db[payment_id]["status"] = "succeeded"
-        elif event_type == "payment.failed":
-            payment_id = payload.get("data", {}).get("payment_id")
-            if payment_id and payment_id in payments_db:
-                payments_db[payment_id]["status"] = "failed"
-        
-        return {"received": True}
-    except:
-        # INTENTIONAL: Swallowing webhook errors
+    async with admission_controller.admit(PRIORITY_WEBHOOK):
+        if not webhook_ingestor.running:
+            await ingest_webhook_events([payload])
+            return {"received": True}
+
+        if not webhook_ingestor.submit(payload):
+            raise HTTPException(
+                status_code=503,
+                detail="Webhook queue full",
+                headers={"Retry-After": "1"}
+            )
         return {"received": True}
+
+
+@router.get("/webhook/stats")
+async def webhook_stats():
+    """Webhook queue depth, lag and counters."""
+    return webhook_ingestor.stats()
+
+
+@router.get("/admission/stats")
+async def admission_stats():
+    """Concurrency limit, queue depths and shed counts per priority class."""
+    return admission_controller.stats()
+
+
+@router.get("/provider/stats")
+async def payment_provider_stats():
+    """Provider client breakers, latencies and intent cache counters."""
+    return provider_stats()
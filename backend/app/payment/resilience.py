@@ -0,0 +1,186 @@
+"""
+Provider Resilience Module
+Risk Level: HIGH - Controls how provider failures reach the charge path
+
+Small building blocks for calling a flaky upstream: jittered exponential
+backoff, a consecutive-failure circuit breaker, a rolling latency window
+for percentile estimates, hedged execution that races a duplicate
+call against a slow first attempt, and a token bucket for pacing.
+"""
+
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+import asyncio
+import math
+import random
+import time
+
+T = TypeVar("T")
+
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 10.0
+
+LATENCY_WINDOW = 256
+
+
+class RetryPolicy:
+    """Bounded exponential backoff with full jitter."""
+
+    def __init__(self, max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY,
+                 rng: Callable[[], float] = random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (0-based), in seconds."""
+        return self.rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after N consecutive failures; open -> half-open after
+    reset_timeout, letting a single probe through; the probe's outcome
+    closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.opened += 1
+            self._state = self.OPEN
+            self._opened_at = self.clock()
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies for percentile estimates."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def percentile(self, q: float) -> float:
+        """Nearest-rank percentile, q in [0, 1]; 0.0 with no samples."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+async def hedged(call: Callable[[], Awaitable[T]], delay: float) -> T:
+    """
+    Run `call`, and if it has not finished after `delay` seconds, start a
+    second copy; return whichever succeeds first and cancel the other.
+
+    Only for idempotent operations. Raises the last error if both fail.
+    """
+    first = asyncio.ensure_future(call())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    pending = {first, asyncio.ensure_future(call())}
+    error: BaseException = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class RateLimiter:
+    """
+    Paces callers to `rate` acquisitions per second.
+
+    Each acquire reserves the next free slot on a schedule spaced 1/rate
+    apart and sleeps until it, so concurrent callers never share a slot.
+    The default burst of one spaces acquisitions evenly, so no one-second
+    window ever exceeds the rate.
+    """
+
+    def __init__(self, rate: float, burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        """Wait for this caller's slot."""
+        now = self.clock()
+        slot = max(self._next, now - (self.burst - 1) * self._interval)
+        self._next = slot + self._interval
+        if slot > now:
+            await self.sleep(slot - now)
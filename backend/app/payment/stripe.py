@@ -5,19 +5,227 @@ Risk Level: HIGH - External payment provider integration
 Contains intentional issues:
 - Hardcoded API keys
 - Insufficient error handling
-- No retry logic
+- No retry logic in the sync client
 """
 
-from typing import Optional, Dict, Any
+from typing import (
+    Optional, Dict, Any, AsyncIterable, AsyncIterator, Awaitable, Callable,
+    Hashable, Iterable, NamedTuple, Tuple, Union
+)
+import asyncio
+import functools
 import hashlib
+import inspect
+import threading
 import time
 import json
+import os
+import httpx
+
+from app.payment.resilience import (
+    CircuitBreaker, LatencyTracker, RateLimiter, RetryPolicy, hedged
+)
+from app.utils.cache import TTLCache
+from app.utils.ids import generate_id
 
 # INTENTIONAL VULNERABILITY: Hardcoded Stripe credentials
 STRIPE_API_KEY = "sk_live_51ABC123def456GHI789jkl"
 STRIPE_WEBHOOK_SECRET = "whsec_abc123def456ghi789"
 STRIPE_API_VERSION = "2023-10-16"
 
+# Provider base URL; when unset the async client talks to the in-process
+# mock provider, which keeps the old simulated behaviour for local runs
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE")
+
+# Async connection pool and timeout defaults (seconds)
+STRIPE_POOL_MAX_CONNECTIONS = int(os.getenv("STRIPE_POOL_MAX_CONNECTIONS", "100"))
+STRIPE_POOL_MAX_KEEPALIVE = int(os.getenv("STRIPE_POOL_MAX_KEEPALIVE", "20"))
+STRIPE_KEEPALIVE_EXPIRY = float(os.getenv("STRIPE_KEEPALIVE_EXPIRY", "30"))
+STRIPE_CONNECT_TIMEOUT = float(os.getenv("STRIPE_CONNECT_TIMEOUT", "2"))
+STRIPE_REQUEST_TIMEOUT = float(os.getenv("STRIPE_REQUEST_TIMEOUT", "10"))
+
+# Hedged reads start a duplicate request once the first has been slower
+# than this quantile of recent latencies, given enough samples
+STRIPE_HEDGE_QUANTILE = 0.95
+STRIPE_HEDGE_MIN_SAMPLES = 20
+
+# Bulk customer creation defaults
+STRIPE_BULK_CONCURRENCY = 32
+STRIPE_BULK_RATE_PER_SECOND = float(os.getenv("STRIPE_BULK_RATE_PER_SECOND", "90"))
+
+# Recently seen payment intents, kept fresh by webhook events
+STRIPE_INTENT_CACHE_SIZE = int(os.getenv("STRIPE_INTENT_CACHE_SIZE", "10000"))
+STRIPE_INTENT_CACHE_TTL = float(os.getenv("STRIPE_INTENT_CACHE_TTL", "60"))
+payment_intent_cache = TTLCache(
+    max_entries=STRIPE_INTENT_CACHE_SIZE,
+    ttl_seconds=STRIPE_INTENT_CACHE_TTL
+)
+
+
+class StripeAPIError(Exception):
+    """Provider call failed at the transport level or returned an error status."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        """Transport errors, rate limits and 5xx may succeed on retry."""
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+class ProviderUnavailableError(StripeAPIError):
+    """Call rejected locally because the endpoint's circuit is open."""
+
+
+class BulkCustomerResult(NamedTuple):
+    """Outcome of one item of a bulk customer creation."""
+    index: int
+    email: Optional[str]
+    customer: Optional[Dict[str, Any]]
+    error: Optional[str]
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable, order-insensitive form of an argument value."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _share(result: Any) -> Any:
+    """Give each coalesced caller its own top-level copy of a dict result."""
+    return dict(result) if isinstance(result, dict) else result
+
+
+class _SyncFlight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one execution.
+
+    Sync callers (threads) wait on the leader's Event; async callers await
+    one shared task per event loop, shielded so a cancelled caller does
+    not cancel the call the others are waiting on. Nothing is cached:
+    the key is released as soon as the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Dict[Hashable, _SyncFlight] = {}
+        self._async: Dict[Tuple[int, Hashable], asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() unless an identical call is in flight; share its outcome."""
+        with self._lock:
+            flight = self._sync.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync[key] = _SyncFlight()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _share(flight.result)
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._sync[key]
+            flight.done.set()
+        return flight.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of do(); fn is a coroutine factory."""
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._async.get(loop_key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._async[loop_key] = task
+            task.add_done_callback(lambda _: self._async.pop(loop_key, None))
+            self.executed += 1
+            return await asyncio.shield(task)
+        self.coalesced += 1
+        return _share(await asyncio.shield(task))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._sync) + len(self._async),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
+
+
+# Shared by every client instance; keys include the instance
+single_flight = SingleFlight()
+
+
+def coalesced(ignore: Tuple[str, ...] = ("timeout",),
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None):
+    """
+    Decorate a sync or async client method so concurrent identical calls
+    share one provider request.
+
+    The key is the method, the client instance and the bound arguments
+    (defaults applied, `ignore`d ones dropped, `normalize` functions
+    applied), so argument order and spelling do not split flights.
+    """
+    normalize = normalize or {}
+
+    def decorator(method):
+        signature = inspect.signature(method)
+        name = method.__qualname__
+
+        def flight_key(args, kwargs) -> Hashable:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            client = arguments.pop("self")
+            return (name, id(client), tuple(
+                (arg, _freeze(normalize[arg](value) if arg in normalize and value is not None else value))
+                for arg, value in arguments.items() if arg not in ignore
+            ))
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                return await single_flight.do_async(
+                    flight_key(args, kwargs), lambda: method(*args, **kwargs)
+                )
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            return single_flight.do(flight_key(args, kwargs), lambda: method(*args, **kwargs))
+        return wrapper
+
+    return decorator
+
+
+def _normalize_email(email: str) -> str:
+    return email.strip().lower()
+
 
 class StripeClient:
     """
@@ -30,6 +238,7 @@ class StripeClient:
         self.api_key = api_key or STRIPE_API_KEY
         self.base_url = "https://api.stripe.com/v1"
     
+    @coalesced(normalize={"email": _normalize_email})
     def create_customer(self, email: str, name: Optional[str] = None, 
                        metadata: Optional[Dict] = None) -> Dict[str, Any]:
         """
@@ -59,7 +268,7 @@ class StripeClient:
         - Amount manipulation possible
         """
         try:
-            intent_id = f"pi_{hashlib.md5(str(time.time()).encode()).hexdigest()[:24]}"
+            intent_id = generate_id("pi")
             client_secret = f"{intent_id}_secret_{hashlib.sha256(str(time.time()).encode()).hexdigest()[:24]}"
             
             return {
@@ -101,7 +310,7 @@ class StripeClient:
         INTENTIONAL: No amount validation
         """
         try:
-            refund_id = f"re_{hashlib.md5(str(time.time()).encode()).hexdigest()[:24]}"
+            refund_id = generate_id("re")
             return {
                 "id": refund_id,
                 "payment_intent": payment_intent_id,
@@ -113,15 +322,21 @@ class StripeClient:
         except:
             return None
     
+    @coalesced()
     def retrieve_payment_intent(self, intent_id: str) -> Dict[str, Any]:
-        """Retrieve payment intent details."""
-        # INTENTIONAL: No caching, no rate limiting
-        return {
+        """Retrieve payment intent details, served from the intent cache when fresh."""
+        cached = payment_intent_cache.get(intent_id)
+        if cached is not None:
+            return dict(cached)
+        # INTENTIONAL: No rate limiting
+        intent = {
             "id": intent_id,
             "status": "succeeded",
             "amount": 1000,
             "currency": "usd"
         }
+        payment_intent_cache.put(intent_id, intent)
+        return dict(intent)
     
     def create_checkout_session(self, line_items: list, 
                                success_url: str,
@@ -131,7 +346,7 @@ class StripeClient:
         INTENTIONAL: URL not validated
         """
         try:
-            session_id = f"cs_{hashlib.md5(str(time.time()).encode()).hexdigest()[:24]}"
+            session_id = generate_id("cs")
             return {
                 "id": session_id,
                 "url": f"https://checkout.stripe.com/pay/{session_id}",
@@ -160,6 +375,9 @@ class StripeClient:
             event_type = event.get("type", "")
             data = event.get("data", {})
             
+            if event_type.startswith("payment_intent."):
+                refresh_cached_intent(data)
+            
             # Process event (simplified)
             return {
                 "handled": True,
@@ -171,15 +389,420 @@ class StripeClient:
             return {"handled": False}
 
 
+def refresh_cached_intent(data: Dict[str, Any]) -> None:
+    """
+    Apply a payment_intent.* event's data to the intent cache.
+
+    Events carrying the full intent object replace the cached copy;
+    anything else just invalidates it so the next read refetches.
+    """
+    intent = data.get("object")
+    if isinstance(intent, dict) and intent.get("id") and "status" in intent:
+        payment_intent_cache.put(intent["id"], intent)
+        return
+    intent_id = data.get("id") or data.get("payment_intent")
+    if intent_id:
+        payment_intent_cache.invalidate(intent_id)
+
+
+class AsyncStripeClient:
+    """
+    Non-blocking Stripe API client on a shared keep-alive connection pool.
+
+    One httpx.AsyncClient is reused for every call so TCP/TLS connections
+    stay warm. Each method accepts a per-call timeout overriding the
+    client default.
+    """
+
+    def __init__(self, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None,
+                 max_connections: int = STRIPE_POOL_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = STRIPE_POOL_MAX_KEEPALIVE,
+                 keepalive_expiry: float = STRIPE_KEEPALIVE_EXPIRY,
+                 connect_timeout: float = STRIPE_CONNECT_TIMEOUT,
+                 timeout: float = STRIPE_REQUEST_TIMEOUT,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_key = api_key or STRIPE_API_KEY
+        if transport is None and base_url is None:
+            from app.payment.mock_provider import app as mock_provider_app
+            transport = httpx.ASGITransport(app=mock_provider_app)
+            base_url = "http://mock-provider/v1"
+        self.base_url = (base_url or "https://api.stripe.com/v1").rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url + "/",
+            auth=(self.api_key, ""),
+            headers={"Stripe-Version": STRIPE_API_VERSION},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=self.timeout,
+            transport=transport
+        )
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        await self._client.aclose()
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        if timeout is None:
+            return self.timeout
+        return httpx.Timeout(timeout, connect=min(timeout, self.timeout.connect))
+
+    async def _request(self, method: str, path: str,
+                       data: Optional[Dict[str, Any]] = None,
+                       timeout: Optional[float] = None,
+                       idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        form = {k: v for k, v in (data or {}).items() if v is not None}
+        try:
+            response = await self._client.request(
+                method, path.lstrip("/"),
+                data=form or None,
+                headers=headers,
+                timeout=self._timeout(timeout)
+            )
+        except httpx.HTTPError as e:
+            raise StripeAPIError(f"{type(e).__name__} calling {path}") from e
+        if response.status_code >= 400:
+            raise StripeAPIError(
+                f"Provider returned {response.status_code} for {path}",
+                status_code=response.status_code
+            )
+        return response.json()
+
+    async def create_customer(self, email: str, name: Optional[str] = None,
+                              timeout: Optional[float] = None,
+                              idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a customer."""
+        return await self._request(
+            "POST", "/customers", {"email": email, "name": name},
+            timeout=timeout, idempotency_key=idempotency_key
+        )
+
+    async def create_payment_intent(self, amount: int, currency: str = "usd",
+                                    customer_id: Optional[str] = None,
+                                    payment_method_data: Optional[Dict[str, Any]] = None,
+                                    confirm: bool = False,
+                                    timeout: Optional[float] = None,
+                                    idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create (and optionally confirm) a payment intent."""
+        data = {
+            "amount": amount,
+            "currency": currency,
+            "customer": customer_id,
+            "confirm": "true" if confirm else None
+        }
+        for field, value in (payment_method_data or {}).items():
+            data[f"payment_method_data[card][{field}]"] = value
+        if payment_method_data:
+            data["payment_method_data[type]"] = "card"
+        return await self._request(
+            "POST", "/payment_intents", data,
+            timeout=timeout, idempotency_key=idempotency_key
+        )
+
+    async def confirm_payment_intent(self, intent_id: str,
+                                     payment_method: Optional[str] = None,
+                                     timeout: Optional[float] = None,
+                                     idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Confirm a payment intent."""
+        return await self._request(
+            "POST", f"/payment_intents/{intent_id}/confirm",
+            {"payment_method": payment_method},
+            timeout=timeout, idempotency_key=idempotency_key
+        )
+
+    async def retrieve_payment_intent(self, intent_id: str,
+                                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Retrieve payment intent details."""
+        return await self._request("GET", f"/payment_intents/{intent_id}", timeout=timeout)
+
+    async def create_refund(self, payment_intent_id: str,
+                            amount: Optional[int] = None,
+                            reason: Optional[str] = None,
+                            timeout: Optional[float] = None,
+                            idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a refund."""
+        return await self._request(
+            "POST", "/refunds",
+            {"payment_intent": payment_intent_id, "amount": amount, "reason": reason},
+            timeout=timeout, idempotency_key=idempotency_key
+        )
+
+    async def create_checkout_session(self, success_url: str, cancel_url: str,
+                                      timeout: Optional[float] = None,
+                                      idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a checkout session."""
+        return await self._request(
+            "POST", "/checkout/sessions",
+            {"success_url": success_url, "cancel_url": cancel_url},
+            timeout=timeout, idempotency_key=idempotency_key
+        )
+
+
+class ResilientStripeClient:
+    """
+    AsyncStripeClient wrapper adding retries, hedged reads and per-endpoint
+    circuit breakers.
+
+    Writes get an Idempotency-Key (generated once per logical call unless
+    the caller supplies one), which makes them safe to retry with jittered
+    backoff. Reads are hedged: a duplicate GET starts once the first has
+    run longer than the endpoint's recent p95. After consecutive retryable
+    failures an endpoint's breaker opens and calls fail fast with
+    ProviderUnavailableError until a probe succeeds.
+    """
+
+    def __init__(self, client: AsyncStripeClient,
+                 retry: Optional[RetryPolicy] = None,
+                 breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+                 hedge_quantile: float = STRIPE_HEDGE_QUANTILE,
+                 hedge_min_samples: int = STRIPE_HEDGE_MIN_SAMPLES,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.client = client
+        self.retry = retry or RetryPolicy()
+        self.breaker_factory = breaker_factory
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.sleep = sleep
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.retries = 0
+        self.hedges = 0
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def _call(self, endpoint: str, call: Callable[[], Awaitable[Dict[str, Any]]],
+                    hedge: bool = False) -> Dict[str, Any]:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = self.breaker_factory()
+        latency = self.latencies.setdefault(endpoint, LatencyTracker())
+
+        for attempt in range(self.retry.max_attempts):
+            if not breaker.allow():
+                raise ProviderUnavailableError(f"Circuit open for {endpoint}", status_code=503)
+            started = time.monotonic()
+            try:
+                if hedge and len(latency) >= self.hedge_min_samples:
+                    self.hedges += 1
+                    result = await hedged(call, latency.percentile(self.hedge_quantile))
+                else:
+                    result = await call()
+            except StripeAPIError as e:
+                if not e.retryable:
+                    # The provider answered; it is healthy even if the request was bad
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt + 1 == self.retry.max_attempts:
+                    raise
+                self.retries += 1
+                await self.sleep(self.retry.backoff(attempt))
+                continue
+            breaker.record_success()
+            latency.add(time.monotonic() - started)
+            return result
+
+    @coalesced(normalize={"email": _normalize_email})
+    async def create_customer(self, email: str, name: Optional[str] = None,
+                              timeout: Optional[float] = None,
+                              idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a customer, retrying under one idempotency key."""
+        key = idempotency_key or generate_id("idem")
+        return await self._call("customers.create", lambda: self.client.create_customer(
+            email, name, timeout=timeout, idempotency_key=key
+        ))
+
+    async def create_payment_intent(self, amount: int, currency: str = "usd",
+                                    customer_id: Optional[str] = None,
+                                    payment_method_data: Optional[Dict[str, Any]] = None,
+                                    confirm: bool = False,
+                                    timeout: Optional[float] = None,
+                                    idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create (and optionally confirm) an intent, retrying under one idempotency key."""
+        key = idempotency_key or generate_id("idem")
+        return await self._call("payment_intents.create", lambda: self.client.create_payment_intent(
+            amount, currency, customer_id, payment_method_data, confirm,
+            timeout=timeout, idempotency_key=key
+        ))
+
+    async def confirm_payment_intent(self, intent_id: str,
+                                     payment_method: Optional[str] = None,
+                                     timeout: Optional[float] = None,
+                                     idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Confirm an intent, retrying under one idempotency key."""
+        key = idempotency_key or generate_id("idem")
+        return await self._call("payment_intents.confirm", lambda: self.client.confirm_payment_intent(
+            intent_id, payment_method, timeout=timeout, idempotency_key=key
+        ))
+
+    @coalesced()
+    async def retrieve_payment_intent(self, intent_id: str,
+                                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Retrieve an intent, from the intent cache when fresh, otherwise with
+        retries and a hedged duplicate when slow.
+        """
+        cached = payment_intent_cache.get(intent_id)
+        if cached is not None:
+            return dict(cached)
+        intent = await self._call(
+            "payment_intents.retrieve",
+            lambda: self.client.retrieve_payment_intent(intent_id, timeout=timeout),
+            hedge=True
+        )
+        payment_intent_cache.put(intent_id, intent)
+        return dict(intent)
+
+    async def create_refund(self, payment_intent_id: str,
+                            amount: Optional[int] = None,
+                            reason: Optional[str] = None,
+                            timeout: Optional[float] = None,
+                            idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a refund, retrying under one idempotency key."""
+        key = idempotency_key or generate_id("idem")
+        return await self._call("refunds.create", lambda: self.client.create_refund(
+            payment_intent_id, amount, reason, timeout=timeout, idempotency_key=key
+        ))
+
+    async def create_checkout_session(self, success_url: str, cancel_url: str,
+                                      timeout: Optional[float] = None,
+                                      idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a checkout session, retrying under one idempotency key."""
+        key = idempotency_key or generate_id("idem")
+        return await self._call("checkout_sessions.create", lambda: self.client.create_checkout_session(
+            success_url, cancel_url, timeout=timeout, idempotency_key=key
+        ))
+
+    async def create_customers_bulk(
+        self,
+        customers: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        concurrency: int = STRIPE_BULK_CONCURRENCY,
+        rate_per_second: Optional[float] = STRIPE_BULK_RATE_PER_SECOND
+    ) -> AsyncIterator[BulkCustomerResult]:
+        """
+        Create many customers, yielding each result as soon as it completes.
+
+        Items are pulled lazily, so the input can be a generator of any
+        size; at most `concurrency` calls are in flight and new calls
+        start at no more than `rate_per_second`. A failed item yields a
+        result with `error` set and the rest of the batch carries on.
+
+        Args:
+            customers: Dicts with "email" and optional "name", sync or async iterable
+            concurrency: Maximum concurrent provider calls
+            rate_per_second: Call start rate limit; None disables pacing
+
+        Yields:
+            BulkCustomerResult per input item, in completion order
+        """
+        limiter = RateLimiter(rate_per_second) if rate_per_second else None
+        if isinstance(customers, AsyncIterable):
+            source = customers.__aiter__()
+        else:
+            plain = iter(customers)
+
+            async def _plain_source():
+                for item in plain:
+                    yield item
+            source = _plain_source()
+
+        async def create(index: int, item: Dict[str, Any]) -> BulkCustomerResult:
+            email = item.get("email") if isinstance(item, dict) else None
+            if not email:
+                return BulkCustomerResult(index, email, None, "Missing email")
+            try:
+                customer = await self.create_customer(email, item.get("name"))
+            except StripeAPIError as e:
+                return BulkCustomerResult(index, email, None, str(e))
+            return BulkCustomerResult(index, email, customer, None)
+
+        pending = set()
+        index = 0
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < concurrency:
+                    try:
+                        item = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    if limiter is not None:
+                        await limiter.acquire()
+                    pending.add(asyncio.ensure_future(create(index, item)))
+                    index += 1
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            # Consumer stopped early: do not leave calls running unobserved
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and latency percentiles per endpoint."""
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "endpoints": {
+                endpoint: {
+                    **breaker.stats(),
+                    "p50_seconds": round(self.latencies[endpoint].percentile(0.5), 6),
+                    "p95_seconds": round(self.latencies[endpoint].percentile(0.95), 6)
+                }
+                for endpoint, breaker in self.breakers.items()
+            }
+        }
+
+
 # Singleton instance
 stripe_client = StripeClient()
 
+# Shared async client, created on first use so it binds to the running loop
+_async_stripe_client: Optional[ResilientStripeClient] = None
+
 
 def get_stripe_client() -> StripeClient:
     """Get Stripe client instance."""
     return stripe_client
 
 
+def get_async_stripe_client() -> ResilientStripeClient:
+    """Get the shared, connection-pooled async Stripe client."""
+    global _async_stripe_client
+    if _async_stripe_client is None:
+        _async_stripe_client = ResilientStripeClient(AsyncStripeClient(
+            api_key=os.getenv("STRIPE_SECRET_KEY"),
+            base_url=STRIPE_API_BASE
+        ))
+    return _async_stripe_client
+
+
+def provider_stats() -> Dict[str, Any]:
+    """Intent cache counters plus the async client's breaker and latency stats."""
+    return {
+        "intent_cache": payment_intent_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "client": _async_stripe_client.stats() if _async_stripe_client is not None else None
+    }
+
+
+async def close_async_stripe_client() -> None:
+    """Close the shared async client's connection pool."""
+    global _async_stripe_client
+    if _async_stripe_client is not None:
+        await _async_stripe_client.aclose()
+        _async_stripe_client = None
+
+
 def create_payment_link(amount: int, description: str) -> str:
     """
     Create a payment link.
@@ -0,0 +1,313 @@
+"""
+Write-Ahead Log Module
+Risk Level: HIGH - Durability of the in-memory payment store
+
+Append-only log of payment and refund mutations with group commit, plus
+compact snapshots for fast restart. Appends only copy bytes into a
+buffer; a writer thread flushes whatever has accumulated with a single
+write() and fsync(), so many concurrent mutations share one disk sync.
+
+On disk, in one directory:
+    wal-<first lsn>.log       log segments, rotated by size
+    snapshot-<lsn>.snap       full state as of (at least) <lsn>
+
+Every frame is [u32 length][u32 crc32][u64 lsn][payload], where payload
+is a compact JSON [op, data] pair. Snapshots are fuzzy: state is copied
+after their LSN is taken, so replay must be idempotent. Recovery maps the
+newest snapshot with mmap and replays only log frames past its LSN.
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+_FRAME_HEADER = struct.Struct("<IIQ")
+_SNAPSHOT_MAGIC = b"PAYSNAP1"
+
+WAL_SEGMENT_BYTES = 64 * 1024 * 1024
+
+
+def _encode_payload(op: str, data: Dict[str, Any]) -> bytes:
+    return json.dumps([op, data], separators=(",", ":")).encode()
+
+
+def _encode_frame(lsn: int, payload: bytes) -> bytes:
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload), lsn) + payload
+
+
+def _read_frames(buffer, offset: int = 0) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """Yield (lsn, op, data) from a buffer, stopping at a torn or corrupt frame."""
+    end = len(buffer)
+    header_size = _FRAME_HEADER.size
+    while offset + header_size <= end:
+        length, crc, lsn = _FRAME_HEADER.unpack_from(buffer, offset)
+        start = offset + header_size
+        if start + length > end:
+            return
+        payload = buffer[start:start + length]
+        if zlib.crc32(payload) != crc:
+            return
+        op, data = json.loads(payload)
+        yield lsn, op, data
+        offset = start + length
+
+
+def _mapped(path: str):
+    """Read-only mmap of a file, or b"" for an empty one."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _file_lsn(path: str) -> int:
+    return int(os.path.basename(path).split("-", 1)[1].split(".", 1)[0])
+
+
+class WriteAheadLog:
+    """Group-committed mutation log with snapshot-based compaction."""
+
+    def __init__(self, directory: str, fsync: bool = True,
+                 segment_bytes: int = WAL_SEGMENT_BYTES):
+        self.directory = directory
+        self.fsync = fsync
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        self._buffer = bytearray()
+        self._waiters: List[Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._next_lsn = 1
+        self._durable_lsn = 0
+        self._snapshot_lsn = 0
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self._fd: Optional[int] = None
+        self._segment_size = 0
+
+        self.appended = 0
+        self.appended_since_snapshot = 0
+        self.commits = 0
+
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "wal-*.log")), key=_file_lsn)
+
+    def _snapshots(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, "snapshot-*.snap")), key=_file_lsn)
+
+    def replay(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield every (op, data) needed to rebuild state, oldest first.
+
+        Reads the newest snapshot, then log frames with a greater LSN.
+        Must run before start().
+        """
+        last_lsn = 0
+        snapshots = self._snapshots()
+        if snapshots:
+            buffer = _mapped(snapshots[-1])
+            try:
+                if buffer[:len(_SNAPSHOT_MAGIC)] == _SNAPSHOT_MAGIC:
+                    last_lsn = _file_lsn(snapshots[-1])
+                    for _, op, data in _read_frames(buffer, len(_SNAPSHOT_MAGIC)):
+                        yield op, data
+            finally:
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
+        self._snapshot_lsn = last_lsn
+
+        for path in self._segments():
+            buffer = _mapped(path)
+            try:
+                for lsn, op, data in _read_frames(buffer):
+                    if lsn > last_lsn:
+                        last_lsn = lsn
+                        yield op, data
+            finally:
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
+
+        self._next_lsn = last_lsn + 1
+        self._durable_lsn = last_lsn
+
+    def start(self) -> None:
+        """Open a fresh segment and start the group-commit writer thread."""
+        self._open_segment(self._next_lsn)
+        self._closing = False
+        self._thread = threading.Thread(target=self._writer, name="payment-wal", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Flush pending records and stop the writer."""
+        if self._thread is None:
+            return
+        with self._lock:
+            self._closing = True
+            self._work.notify()
+        self._thread.join()
+        self._thread = None
+        os.close(self._fd)
+        self._fd = None
+
+    def _open_segment(self, first_lsn: int) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+        path = os.path.join(self.directory, f"wal-{first_lsn:020d}.log")
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._segment_size = os.fstat(self._fd).st_size
+
+    def append(self, op: str, data: Dict[str, Any]) -> int:
+        """
+        Buffer a mutation for the next group commit.
+
+        Returns:
+            The record's LSN; pass it to wait_durable to block until synced
+        """
+        payload = _encode_payload(op, data)
+        checksum = zlib.crc32(payload)
+        with self._lock:
+            lsn = self._next_lsn
+            self._next_lsn += 1
+            self._buffer += _FRAME_HEADER.pack(len(payload), checksum, lsn)
+            self._buffer += payload
+            self.appended += 1
+            self.appended_since_snapshot += 1
+            self._work.notify()
+        return lsn
+
+    def wait_durable(self, lsn: int, timeout: Optional[float] = None) -> bool:
+        """Block until the record with this LSN is on disk."""
+        with self._lock:
+            return self._synced.wait_for(lambda: self._durable_lsn >= lsn, timeout)
+
+    async def append_durable(self, records: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Append records and wait, without blocking the loop, until they are synced."""
+        lsn = 0
+        for op, data in records:
+            lsn = self.append(op, data)
+        if lsn == 0:
+            return lsn
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._durable_lsn >= lsn:
+                return lsn
+            self._waiters.append((lsn, loop, future))
+        await future
+        return lsn
+
+    def _writer(self) -> None:
+        while True:
+            with self._lock:
+                while not self._buffer and not self._closing:
+                    self._work.wait()
+                if not self._buffer and self._closing:
+                    return
+                chunk = self._buffer
+                self._buffer = bytearray()
+                last_lsn = self._next_lsn - 1
+
+            # Appends arriving during write/fsync form the next group
+            if self._segment_size >= self.segment_bytes:
+                self._open_segment(_FRAME_HEADER.unpack_from(chunk, 0)[2])
+            view = memoryview(chunk)
+            while view:
+                view = view[os.write(self._fd, view):]
+            self._segment_size += len(chunk)
+            if self.fsync:
+                os.fsync(self._fd)
+
+            with self._lock:
+                self._durable_lsn = last_lsn
+                self.commits += 1
+                ready = [w for w in self._waiters if w[0] <= last_lsn]
+                self._waiters = [w for w in self._waiters if w[0] > last_lsn]
+                self._synced.notify_all()
+            for _, loop, future in ready:
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_resolve, future)
+
+    @property
+    def last_lsn(self) -> int:
+        with self._lock:
+            return self._next_lsn - 1
+
+    def write_snapshot(self, lsn: int, records: Iterable[Tuple[str, Dict[str, Any]]]) -> str:
+        """
+        Write a snapshot of state as of at least `lsn`, then drop older files.
+
+        Args:
+            lsn: LSN read (via last_lsn) before the state was copied
+            records: (op, data) pairs that rebuild the full state
+
+        Returns:
+            Path of the new snapshot
+        """
+        path = os.path.join(self.directory, f"snapshot-{lsn:020d}.snap")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb", buffering=1024 * 1024) as f:
+            f.write(_SNAPSHOT_MAGIC)
+            for op, data in records:
+                f.write(_encode_frame(lsn, _encode_payload(op, data)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._snapshot_lsn = lsn
+            self.appended_since_snapshot = max(0, self._next_lsn - 1 - lsn)
+        self._compact(lsn)
+        return path
+
+    def _compact(self, snapshot_lsn: int) -> None:
+        """Remove older snapshots and segments wholly covered by the snapshot."""
+        for path in self._snapshots()[:-1]:
+            os.remove(path)
+        segments = self._segments()
+        # A segment is obsolete once the next one starts at or before snapshot_lsn + 1
+        for path, following in zip(segments, segments[1:]):
+            if _file_lsn(following) <= snapshot_lsn + 1:
+                os.remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "last_lsn": self._next_lsn - 1,
+                "durable_lsn": self._durable_lsn,
+                "snapshot_lsn": self._snapshot_lsn,
+                "appended": self.appended,
+                "appended_since_snapshot": self.appended_since_snapshot,
+                "commits": self.commits,
+                "pending_bytes": len(self._buffer)
+            }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+async def run_periodic_snapshots(wal: WriteAheadLog,
+                                 collect: Callable[[], List[Tuple[str, Dict[str, Any]]]],
+                                 interval: float, min_records: int) -> None:
+    """
+    Snapshot every `interval` seconds once `min_records` new records exist.
+
+    `collect` runs on the event loop and must return a cheap copy of the
+    state; encoding and fsync happen in a worker thread.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if wal.appended_since_snapshot < min_records:
+            continue
+        lsn = wal.last_lsn
+        records = collect()
+        await asyncio.to_thread(wal.write_snapshot, lsn, records)
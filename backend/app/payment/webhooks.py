@@ -0,0 +1,116 @@
+"""
+Webhook Ingestion Module
+Risk Level: HIGH - Applies provider events to payment state
+
+Bounded asyncio queue between the webhook endpoint and the payment store.
+The endpoint only enqueues; one consumer task drains whatever has piled
+up and hands it to a sync or async apply callback in batches, so bursts
+of events cost one store pass per batch instead of one per request.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import inspect
+import time
+
+WEBHOOK_QUEUE_SIZE = 50000
+WEBHOOK_BATCH_SIZE = 1000
+
+
+class WebhookIngestor:
+    """Queue plus single consumer task that applies events in batches."""
+
+    def __init__(self, apply_batch: Callable[[List[Dict[str, Any]]], Union[int, Awaitable[int]]],
+                 max_depth: int = WEBHOOK_QUEUE_SIZE,
+                 batch_size: int = WEBHOOK_BATCH_SIZE):
+        self.apply_batch = apply_batch
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.rejected = 0
+        self.applied = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.lag_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the consumer task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._task = asyncio.get_running_loop().create_task(self._consume())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Drain queued events (up to timeout) and stop the consumer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """
+        Enqueue an event without waiting.
+
+        Returns:
+            False when the queue is full and the event was not accepted
+        """
+        try:
+            self._queue.put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            batch: List[Tuple[float, Dict[str, Any]]] = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                applied = self.apply_batch([event for _, event in batch])
+                if inspect.isawaitable(applied):
+                    applied = await applied
+                self.applied += applied
+            except Exception as e:
+                self.failed_batches += 1
+                print(f"Webhook batch of {len(batch)} failed: {type(e).__name__}")
+            self.batches += 1
+            self.lag_seconds = time.monotonic() - batch[0][0]
+
+            for _ in batch:
+                self._queue.task_done()
+            # Let request handlers run between batches
+            await asyncio.sleep(0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lag and throughput counters."""
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "capacity": self.max_depth,
+            "lag_seconds": round(self.lag_seconds, 6),
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "applied": self.applied,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches
+        }
@@ -15,6 +15,8 @@ import hashlib
 import time
 import re
 
+from app.utils.ids import generate_id
+
 router = APIRouter()
 
 
@@ -46,7 +48,7 @@ users_db = {}
 
 def generate_user_id() -> str:
     """Generate unique user ID."""
-    return f"user_{hashlib.md5(str(time.time()).encode()).hexdigest()[:12]}"
+    return generate_id("user")
 
 
 def hash_password(password: str) -> str:
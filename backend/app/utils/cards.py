@@ -0,0 +1,175 @@
+"""
+Card Number Validation Module
+Risk Level: LOW - Pure validation logic, no card data is stored
+
+Single Luhn/length/BIN engine shared by the payment processor and the
+input validators. Bulk checks pack PANs into a fixed-width digit matrix
+and run as NumPy array operations; single cards take a scalar fast path.
+"""
+
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+
+MIN_PAN_LENGTH = 13
+MAX_PAN_LENGTH = 19
+
+# Rows per vectorized block; bounds temporary memory on multi-million imports
+CHUNK_ROWS = 1 << 18
+
+# Six-digit BIN (IIN) ranges per card network, inclusive
+CARD_NETWORK_BIN_RANGES = {
+    "visa": [(400000, 499999)],
+    "mastercard": [(222100, 272099), (510000, 559999)],
+    "amex": [(340000, 349999), (370000, 379999)],
+    "discover": [(601100, 601199), (644000, 659999)],
+}
+
+# Whitespace and dashes are accepted as digit-group separators
+_SEPARATOR_TABLE = str.maketrans("", "", " \t\n\r\f\v-")
+
+# Doubled Luhn digit for each input digit, as a translate table and an array
+_LUHN_DOUBLE_TABLE = str.maketrans("0123456789", "0246813579")
+_LUHN_DOUBLE = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+_BIN_WEIGHTS = np.array([100000, 10000, 1000, 100, 10, 1], dtype=np.int64)
+
+
+class CardCheckResult(NamedTuple):
+    """Per-card boolean masks from a bulk validation run."""
+    valid: np.ndarray
+    digits_ok: np.ndarray
+    length_ok: np.ndarray
+    luhn_ok: np.ndarray
+    bin_ok: np.ndarray
+
+
+def normalize_pan(card_number: str) -> str:
+    """
+    Strip the separators customers commonly type into card numbers.
+
+    Args:
+        card_number: Raw card number
+
+    Returns:
+        Card number without whitespace or dashes
+    """
+    return card_number.translate(_SEPARATOR_TABLE)
+
+
+def luhn_valid(digits: str) -> bool:
+    """
+    Scalar Luhn check for a string of ASCII digits.
+
+    Doubled positions are mapped with str.translate and the digit sum is
+    taken over the encoded bytes, so no per-digit Python loop runs.
+
+    Args:
+        digits: Card number containing only digits
+
+    Returns:
+        True if the checksum is valid
+    """
+    folded = digits[-1::-2] + digits[-2::-2].translate(_LUHN_DOUBLE_TABLE)
+    return (sum(folded.encode()) - 48 * len(folded)) % 10 == 0
+
+
+def bin_in_ranges(digits: str, bin_ranges: Sequence[Tuple[int, int]]) -> bool:
+    """Check whether the six-digit BIN of a card falls inside any range."""
+    card_bin = int(digits[:6])
+    return any(low <= card_bin <= high for low, high in bin_ranges)
+
+
+def card_number_error(card_number: str,
+                      bin_ranges: Optional[Sequence[Tuple[int, int]]] = None) -> Optional[str]:
+    """
+    Validate a single card number.
+
+    Args:
+        card_number: Card number, optionally with spaces or dashes
+        bin_ranges: Accepted six-digit BIN ranges, or None to accept any BIN
+
+    Returns:
+        Error message, or None if the card number is valid
+    """
+    if not card_number:
+        return "Card number is required"
+
+    digits = normalize_pan(card_number)
+    if not (digits.isascii() and digits.isdigit()):
+        return "Card number must contain only digits"
+
+    if len(digits) < MIN_PAN_LENGTH or len(digits) > MAX_PAN_LENGTH:
+        return "Invalid card number length"
+
+    if not luhn_valid(digits):
+        return "Invalid card number"
+
+    if bin_ranges is not None and not bin_in_ranges(digits, bin_ranges):
+        return "Unsupported card network"
+
+    return None
+
+
+def _check_chunk(pans: List[str],
+                 bin_ranges: Optional[Sequence[Tuple[int, int]]]) -> CardCheckResult:
+    """Run the vectorized checks over one block of normalized PANs."""
+    n = len(pans)
+    lengths = np.fromiter(map(len, pans), dtype=np.int64, count=n)
+    length_ok = (lengths >= MIN_PAN_LENGTH) & (lengths <= MAX_PAN_LENGTH)
+
+    # Non-ASCII and over-long rows are blanked so they fit the byte matrix
+    packed = [p if ok and p.isascii() else "" for p, ok in zip(pans, length_ok)]
+    matrix = np.array(packed, dtype=f"S{MAX_PAN_LENGTH}").view(np.uint8)
+    matrix = matrix.reshape(n, MAX_PAN_LENGTH)
+
+    padding = matrix == 0
+    digits = matrix - np.uint8(48)
+    is_digit = digits <= 9
+    digits_ok = (is_digit | padding).all(axis=1) & ~padding[:, 0]
+    for i in np.flatnonzero(~length_ok):
+        digits_ok[i] = pans[i].isascii() and pans[i].isdigit()
+    digits[~is_digit] = 0
+
+    # Digits are left-aligned; double every second one counting from the right
+    columns = np.arange(MAX_PAN_LENGTH)
+    doubled = ((lengths[:, None] - 1 - columns[None, :]) & 1).astype(bool) & ~padding
+    values = np.where(doubled, _LUHN_DOUBLE[digits], digits)
+    luhn_ok = values.sum(axis=1, dtype=np.int64) % 10 == 0
+
+    if bin_ranges is None:
+        bin_ok = np.ones(n, dtype=bool)
+    else:
+        card_bins = digits[:, :6].astype(np.int64) @ _BIN_WEIGHTS
+        bin_ok = np.zeros(n, dtype=bool)
+        for low, high in bin_ranges:
+            bin_ok |= (card_bins >= low) & (card_bins <= high)
+
+    valid = digits_ok & length_ok & luhn_ok & bin_ok
+    return CardCheckResult(valid, digits_ok, length_ok, luhn_ok, bin_ok)
+
+
+def validate_card_numbers(card_numbers: Iterable[str],
+                          bin_ranges: Optional[Sequence[Tuple[int, int]]] = None,
+                          chunk_rows: int = CHUNK_ROWS) -> CardCheckResult:
+    """
+    Validate many card numbers with vectorized digit, length, Luhn and BIN checks.
+
+    Args:
+        card_numbers: Card numbers, optionally with spaces or dashes
+        bin_ranges: Accepted six-digit BIN ranges, or None to accept any BIN
+        chunk_rows: Rows processed per vectorized block
+
+    Returns:
+        CardCheckResult with one boolean per card in each mask
+    """
+    pans = [normalize_pan(p) if p else "" for p in card_numbers]
+    if not pans:
+        empty = np.zeros(0, dtype=bool)
+        return CardCheckResult(empty, empty, empty, empty, empty)
+
+    chunks = [
+        _check_chunk(pans[start:start + chunk_rows], bin_ranges)
+        for start in range(0, len(pans), chunk_rows)
+    ]
+    if len(chunks) == 1:
+        return chunks[0]
+    return CardCheckResult(*(np.concatenate(masks) for masks in zip(*chunks)))
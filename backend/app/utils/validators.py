@@ -8,6 +8,8 @@ This module contains well-tested validation functions.
 import re
 from typing import Optional, Tuple
 
+from app.utils.cards import card_number_error
+
 
 def validate_email(email: str) -> Tuple[bool, Optional[str]]:
     """
@@ -162,32 +164,9 @@ def validate_credit_card(card_number: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    if not card_number:
-        return False, "Card number is required"
-    
-    # Remove spaces and dashes
-    cleaned = re.sub(r'[\s\-]', '', card_number)
-    
-    # Check if all digits
-    if not cleaned.isdigit():
-        return False, "Card number must contain only digits"
-    
-    # Check length (13-19 digits)
-    if len(cleaned) < 13 or len(cleaned) > 19:
-        return False, "Invalid card number length"
-    
-    # Luhn algorithm
-    digits = [int(d) for d in cleaned]
-    checksum = 0
-    for i, digit in enumerate(reversed(digits)):
-        if i % 2 == 1:
-            digit *= 2
-            if digit > 9:
-                digit -= 9
-        checksum += digit
-    
-    if checksum % 10 != 0:
-        return False, "Invalid card number"
+    error = card_number_error(card_number)
+    if error:
+        return False, error
     
     return True, None
 
@@ -0,0 +1,620 @@
+"""
+Tests for Payment Processing
+Coverage: MEDIUM - Core charge paths
+"""
+
+import asyncio
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.payment import mock_provider, processor
+from app.payment.admission import (
+    PRIORITY_CHARGE, PRIORITY_REFUND, AdmissionController
+)
+from app.payment.analytics import PaymentLedger
+from app.payment.idempotency import IdempotencyCache
+from app.payment.wal import WriteAheadLog
+from app.payment.webhooks import WebhookIngestor
+
+client = TestClient(app)
+
+# Real provider path, captured before the autouse fixture replaces it
+PROVIDER = processor.process_payment_with_stripe
+
+VALID_CARD = {
+    "card_number": "4532015112830366",
+    "exp_month": 12,
+    "exp_year": 2030,
+    "cvv": "123"
+}
+
+
+def provider_returning(result, calls=None):
+    """Build a stand-in for process_payment_with_stripe."""
+    async def provider(amount, card):
+        if calls is not None:
+            calls.append(amount)
+        return result
+    return provider
+
+
+@pytest.fixture(autouse=True)
+def always_approve(monkeypatch):
+    """Make the simulated provider deterministic."""
+    monkeypatch.setattr(
+        processor,
+        "process_payment_with_stripe",
+        provider_returning({"success": True, "transaction_id": "txn_test"})
+    )
+
+
+class TestBatchCharge:
+    """Test cases for the batch charge endpoint."""
+
+    def test_batch_partial_success(self):
+        """Test that invalid items fail without failing the batch."""
+        response = client.post("/api/payment/charge/batch", json={"payments": [
+            {"amount": 10.0, "payment_method": VALID_CARD},
+            {"amount": 10.0, "payment_method": {**VALID_CARD, "card_number": "1234567890123456"}},
+            {"amount": -1, "payment_method": VALID_CARD},
+            {"amount": 10.0, "payment_method": {**VALID_CARD, "cvv": "12"}},
+            {"amount": 10.0, "payment_method": {**VALID_CARD, "exp_year": 2020}},
+        ]})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 1
+        assert data["failed"] == 4
+        results = data["results"]
+        assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+        assert results[0]["status"] == "succeeded"
+        assert results[0]["payment_id"].startswith("pay_")
+        assert results[1]["error"] == "Invalid card number"
+        assert results[2]["error"] == "Invalid amount"
+        assert results[3]["error"] == "Invalid CVV"
+        assert results[4]["error"] == "Card expired"
+
+    def test_batch_provider_decline(self, monkeypatch):
+        """Test provider declines are reported per item."""
+        monkeypatch.setattr(
+            processor,
+            "process_payment_with_stripe",
+            provider_returning({"success": False, "error": "Payment declined"})
+        )
+        response = client.post("/api/payment/charge/batch", json={"payments": [
+            {"amount": 10.0, "payment_method": VALID_CARD},
+        ]})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["error"] == "Payment declined"
+
+    def test_batch_empty(self):
+        """Test empty batches are rejected."""
+        response = client.post("/api/payment/charge/batch", json={"payments": []})
+        assert response.status_code == 400
+
+    def test_batch_too_large(self, monkeypatch):
+        """Test batches over the size limit are rejected."""
+        monkeypatch.setattr(processor, "MAX_BATCH_SIZE", 2)
+        response = client.post("/api/payment/charge/batch", json={
+            "payments": [{"amount": 1.0, "payment_method": VALID_CARD}] * 3
+        })
+        assert response.status_code == 400
+
+
+class TestProviderClient:
+    """Test cases for charges through the async provider client."""
+
+    def test_charge_through_mock_provider(self, monkeypatch):
+        """Test an approved charge end to end."""
+        monkeypatch.setattr(processor, "process_payment_with_stripe", PROVIDER)
+        monkeypatch.setattr(mock_provider, "DECLINE_RATE", 0.0)
+        response = client.post("/api/payment/charge", json={
+            "amount": 12.34,
+            "payment_method": VALID_CARD
+        })
+        assert response.status_code == 200
+        assert response.json()["status"] == "succeeded"
+
+    def test_decline_through_mock_provider(self, monkeypatch):
+        """Test a provider decline maps to 402."""
+        monkeypatch.setattr(processor, "process_payment_with_stripe", PROVIDER)
+        monkeypatch.setattr(mock_provider, "DECLINE_RATE", 1.0)
+        response = client.post("/api/payment/charge", json={
+            "amount": 12.34,
+            "payment_method": VALID_CARD
+        })
+        assert response.status_code == 402
+        assert response.json()["detail"] == "Payment declined"
+
+
+class TestListPayments:
+    """Test cases for indexed payment listing."""
+
+    def charge(self, customer_id):
+        response = client.post("/api/payment/charge", json={
+            "amount": 5.0,
+            "customer_id": customer_id,
+            "payment_method": VALID_CARD
+        })
+        assert response.status_code == 200
+        return response.json()["payment_id"]
+
+    def test_cursor_pagination(self):
+        """Test walking a customer's payments page by page."""
+        created = [self.charge("cus_pages") for _ in range(5)]
+        seen = []
+        cursor = None
+        while True:
+            params = {"customer_id": "cus_pages", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/api/payment/payments", params=params).json()
+            assert data["total"] == 5
+            seen.extend(p["payment_id"] for p in data["payments"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == created
+
+    def test_customer_filter(self):
+        """Test that only the requested customer's payments are listed."""
+        self.charge("cus_filter_a")
+        data = client.get("/api/payment/payments", params={"customer_id": "cus_filter_b"}).json()
+        assert data == {"payments": [], "total": 0, "next_cursor": None}
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected."""
+        response = client.get("/api/payment/payments", params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+class TestIdempotency:
+    """Test cases for Idempotency-Key handling."""
+
+    def test_charge_replay(self, monkeypatch):
+        """Test retries replay the first charge without calling the provider."""
+        calls = []
+        monkeypatch.setattr(
+            processor,
+            "process_payment_with_stripe",
+            provider_returning({"success": True, "transaction_id": "txn_test"}, calls)
+        )
+        body = {"amount": 7.0, "payment_method": VALID_CARD}
+        headers = {"Idempotency-Key": "charge-replay-1"}
+        first = client.post("/api/payment/charge", json=body, headers=headers)
+        second = client.post("/api/payment/charge", json=body, headers=headers)
+        assert first.status_code == 200
+        assert second.json() == first.json()
+        assert len(calls) == 1
+
+    def test_key_reuse_with_different_body(self):
+        """Test a key cannot be replayed for a different request."""
+        headers = {"Idempotency-Key": "charge-reuse-1"}
+        client.post("/api/payment/charge", json={"amount": 7.0, "payment_method": VALID_CARD}, headers=headers)
+        response = client.post("/api/payment/charge", json={"amount": 8.0, "payment_method": VALID_CARD}, headers=headers)
+        assert response.status_code == 422
+
+    def test_client_error_replayed(self):
+        """Test 4xx outcomes are cached like successes."""
+        headers = {"Idempotency-Key": "charge-error-1"}
+        body = {"amount": 7.0, "payment_method": {**VALID_CARD, "cvv": "1"}}
+        first = client.post("/api/payment/charge", json=body, headers=headers)
+        second = client.post("/api/payment/charge", json=body, headers=headers)
+        assert first.status_code == second.status_code == 400
+
+    def test_concurrent_requests_coalesce(self):
+        """Test concurrent calls with one key share a single execution."""
+        cache = IdempotencyCache()
+        calls = []
+
+        async def operation():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        async def main():
+            return await asyncio.gather(*[
+                cache.run("charge", "k", "fp", operation) for _ in range(10)
+            ])
+
+        results = asyncio.run(main())
+        assert results == [{"ok": True}] * 10
+        assert len(calls) == 1
+
+    def test_ttl_and_capacity(self):
+        """Test entries expire and the cache stays bounded."""
+        now = [0.0]
+        cache = IdempotencyCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+        calls = []
+
+        async def operation():
+            calls.append(1)
+            return len(calls)
+
+        async def main():
+            for key in ["a", "b", "c"]:
+                await cache.run("refund", key, "fp", operation)
+            assert len(cache) == 2
+            assert await cache.run("refund", "a", "fp", operation) == 4
+            now[0] = 20.0
+            assert await cache.run("refund", "c", "fp", operation) == 5
+
+        asyncio.run(main())
+
+
+class TestWebhookIngestion:
+    """Test cases for queued webhook ingestion."""
+
+    def store_payment(self, payment_id):
+        processor.payments_db[payment_id] = {
+            "payment_id": payment_id,
+            "customer_id": None,
+            "status": "pending",
+            "created_at": 0
+        }
+
+    def test_queued_events_applied(self):
+        """Test events are applied by the consumer task."""
+        self.store_payment("pay_webhook_queued")
+        with TestClient(app) as lifespan_client:
+            response = lifespan_client.post("/api/payment/webhook", json={
+                "type": "payment.failed",
+                "data": {"payment_id": "pay_webhook_queued"}
+            })
+            assert response.status_code == 200
+            stats = lifespan_client.get("/api/payment/webhook/stats").json()
+            assert stats["running"] is True
+            assert stats["enqueued"] >= 1
+        assert processor.payments_db["pay_webhook_queued"]["status"] == "failed"
+
+    def test_inline_without_consumer(self):
+        """Test events apply inline when no consumer is running."""
+        self.store_payment("pay_webhook_inline")
+        client.post("/api/payment/webhook", json={
+            "type": "payment.succeeded",
+            "data": {"payment_id": "pay_webhook_inline"}
+        })
+        assert processor.payments_db["pay_webhook_inline"]["status"] == "succeeded"
+
+    def test_batch_coalesces_updates(self):
+        """Test only the last status per payment is written."""
+        self.store_payment("pay_webhook_coalesce")
+        updated = processor.apply_webhook_events([
+            {"type": "payment.failed", "data": {"payment_id": "pay_webhook_coalesce"}},
+            {"type": "payment.succeeded", "data": {"payment_id": "pay_webhook_coalesce"}},
+            {"type": "payment.unknown", "data": {"payment_id": "pay_webhook_coalesce"}},
+            {"type": "payment.failed", "data": {"payment_id": "pay_missing"}},
+        ])
+        assert updated == {"pay_webhook_coalesce": "succeeded"}
+        assert processor.payments_db["pay_webhook_coalesce"]["status"] == "succeeded"
+
+    def test_full_queue_rejects(self):
+        """Test submit refuses events beyond capacity."""
+        applied = []
+
+        async def main():
+            ingestor = WebhookIngestor(lambda events: applied.extend(events) or len(events), max_depth=2)
+            ingestor.start()
+            accepted = [ingestor.submit({"n": i}) for i in range(3)]
+            await ingestor.stop()
+            return accepted, ingestor.stats()
+
+        accepted, stats = asyncio.run(main())
+        assert accepted == [True, True, False]
+        assert stats["rejected"] == 1
+        assert stats["batches"] == 1
+        assert len(applied) == 2
+
+
+class TestRefundLedger:
+    """Test cases for per-payment refund totals."""
+
+    def charge(self, amount):
+        response = client.post("/api/payment/charge", json={
+            "amount": amount,
+            "payment_method": VALID_CARD
+        })
+        return response.json()["payment_id"]
+
+    def test_partial_then_remaining_refund(self):
+        """Test partial refunds track the remaining balance."""
+        payment_id = self.charge(10.0)
+        first = client.post("/api/payment/refund", json={"payment_id": payment_id, "amount": 2.5})
+        assert first.status_code == 200
+        rest = client.post("/api/payment/refund", json={"payment_id": payment_id})
+        assert rest.json()["amount"] == 7.5
+        again = client.post("/api/payment/refund", json={"payment_id": payment_id})
+        assert again.status_code == 400
+        assert again.json()["detail"] == "Payment already fully refunded"
+
+    def test_over_refund_rejected(self):
+        """Test refunds cannot exceed the payment amount."""
+        payment_id = self.charge(10.0)
+        client.post("/api/payment/refund", json={"payment_id": payment_id, "amount": 6.0})
+        response = client.post("/api/payment/refund", json={"payment_id": payment_id, "amount": 4.01})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Refund exceeds remaining balance"
+
+    def test_list_refunds(self):
+        """Test paginated per-payment refund listing."""
+        payment_id = self.charge(0.3)
+        for _ in range(3):
+            client.post("/api/payment/refund", json={"payment_id": payment_id, "amount": 0.1})
+        page = client.get(f"/api/payment/payment/{payment_id}/refunds", params={"limit": 2}).json()
+        assert page["total"] == 3
+        assert len(page["refunds"]) == 2
+        assert page["refunded_amount"] == 0.3
+        assert page["refundable_amount"] == 0.0
+        rest = client.get(
+            f"/api/payment/payment/{payment_id}/refunds",
+            params={"limit": 2, "cursor": page["next_cursor"]}
+        ).json()
+        assert len(rest["refunds"]) == 1
+        assert rest["next_cursor"] is None
+
+    def test_list_refunds_unknown_payment(self):
+        """Test listing refunds of a missing payment."""
+        response = client.get("/api/payment/payment/pay_missing/refunds")
+        assert response.status_code == 404
+
+
+class TestPaymentExport:
+    """Test cases for streaming payment export."""
+
+    def charge(self, customer_id, currency="usd"):
+        response = client.post("/api/payment/charge", json={
+            "amount": 3.0,
+            "currency": currency,
+            "customer_id": customer_id,
+            "payment_method": VALID_CARD
+        })
+        return response.json()["payment_id"]
+
+    def test_ndjson_export(self, monkeypatch):
+        """Test NDJSON export with filters across chunk boundaries."""
+        monkeypatch.setattr(processor, "EXPORT_CHUNK_ROWS", 2)
+        expected = [self.charge("cus_export") for _ in range(5)]
+        self.charge("cus_export", currency="eur")
+        response = client.get("/api/payment/payments/export", params={
+            "customer_id": "cus_export",
+            "currency": "usd"
+        })
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["payment_id"] for r in rows] == expected
+
+    def test_csv_export(self):
+        """Test CSV export includes a header and one row per payment."""
+        payment_id = self.charge("cus_export_csv")
+        response = client.get("/api/payment/payments/export", params={
+            "customer_id": "cus_export_csv",
+            "format": "csv"
+        })
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [r["payment_id"] for r in rows] == [payment_id]
+        assert rows[0]["currency"] == "usd"
+
+    def test_created_range(self):
+        """Test created_at range filtering."""
+        self.charge("cus_export_range")
+        response = client.get("/api/payment/payments/export", params={
+            "customer_id": "cus_export_range",
+            "created_to": 0
+        })
+        assert response.text == ""
+
+    def test_invalid_format(self):
+        """Test unknown formats are rejected."""
+        response = client.get("/api/payment/payments/export", params={"format": "xml"})
+        assert response.status_code == 400
+
+
+class TestPaymentStoreRecovery:
+    """Test cases for rebuilding the store from the WAL."""
+
+    def test_restore_rebuilds_indexes(self, tmp_path, monkeypatch):
+        """Test replay restores payments, refunds and the refund ledger."""
+        wal = WriteAheadLog(str(tmp_path))
+        list(wal.replay())
+        wal.start()
+        records = [
+            ("payment", {"payment_id": "pay_wal", "amount": 5.0, "currency": "usd",
+                         "status": "succeeded", "created_at": 1, "customer_id": "cus_wal"}),
+            ("refund", {"refund_id": "ref_wal", "payment_id": "pay_wal", "amount": 2.0,
+                        "reason": None, "status": "succeeded", "created_at": 2}),
+            ("status", {"payment_id": "pay_wal", "status": "disputed"}),
+        ]
+        for op, data in records:
+            wal.append(op, data)
+        wal.close()
+        # Same records again in a snapshot must not double-count the refund
+        wal.write_snapshot(2, records[:2])
+
+        monkeypatch.setattr(processor, "payment_wal", WriteAheadLog(str(tmp_path)))
+        assert processor.restore_payment_store() == 3
+        assert processor.payments_db["pay_wal"]["status"] == "disputed"
+        assert processor.refundable_minor_units(processor.payments_db["pay_wal"]) == 300
+        page = client.get("/api/payment/payments", params={"customer_id": "cus_wal"}).json()
+        assert [p["payment_id"] for p in page["payments"]] == ["pay_wal"]
+
+
+class TestPaymentStats:
+    """Test cases for rollup-backed payment stats."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_ledger(self, monkeypatch):
+        monkeypatch.setattr(processor, "payment_ledger", PaymentLedger())
+
+    def charge(self, amount, currency="usd", customer_id=None):
+        response = client.post("/api/payment/charge", json={
+            "amount": amount,
+            "currency": currency,
+            "customer_id": customer_id,
+            "payment_method": VALID_CARD
+        })
+        return response.json()["payment_id"]
+
+    def test_totals_track_charges_and_refunds(self):
+        """Test totals are kept in cents per currency."""
+        payment_id = self.charge(10.10)
+        self.charge(0.20)
+        self.charge(5.0, currency="eur")
+        client.post("/api/payment/refund", json={"payment_id": payment_id, "amount": 0.1})
+        data = client.get("/api/payment/payment/stats").json()
+        usd = data["currencies"]["usd"]
+        assert usd["charged_cents"] == 1030
+        assert usd["refunded_cents"] == 10
+        assert usd["net_cents"] == 1020
+        assert (usd["charges"], usd["refunds"]) == (2, 1)
+        assert usd["statuses"] == {"succeeded": 2}
+        assert data["currencies"]["eur"]["charged_cents"] == 500
+
+    def test_status_changes_move_counts(self):
+        """Test webhook status updates are reflected in status counts."""
+        payment_id = self.charge(3.0)
+        client.post("/api/payment/webhook", json={
+            "type": "payment.failed",
+            "data": {"payment_id": payment_id}
+        })
+        statuses = client.get("/api/payment/payment/stats").json()["currencies"]["usd"]["statuses"]
+        assert statuses == {"failed": 1}
+
+    def test_customer_and_time_range(self):
+        """Test per-customer totals and hourly buckets."""
+        self.charge(2.0, customer_id="cus_stats")
+        self.charge(4.0, customer_id="cus_other")
+        customer = client.get("/api/payment/payment/stats", params={"customer_id": "cus_stats"}).json()
+        assert customer["currencies"]["usd"]["charged_cents"] == 200
+
+        series = client.get("/api/payment/payment/stats", params={"created_from": 0}).json()
+        usd = series["currencies"]["usd"]
+        assert usd["total"]["charged_cents"] == 600
+        assert len(usd["buckets"]) == 1
+        assert usd["buckets"][0]["bucket_start"] % 3600 == 0
+
+        empty = client.get("/api/payment/payment/stats", params={"created_from": 0, "created_to": 10}).json()
+        assert empty["currencies"]["usd"]["total"]["charges"] == 0
+
+    def test_invalid_range(self):
+        """Test inverted time ranges are rejected."""
+        response = client.get("/api/payment/payment/stats", params={"created_from": 10, "created_to": 5})
+        assert response.status_code == 400
+
+
+class TestAdmissionControl:
+    """Test cases for adaptive admission control."""
+
+    def test_limit_follows_latency(self):
+        """Test slow requests shrink the limit and fast ones grow it."""
+        now = [100.0]
+        controller = AdmissionController(initial_limit=10, min_limit=2,
+                                         target_latency=0.1, clock=lambda: now[0])
+
+        async def main():
+            await controller.acquire(PRIORITY_CHARGE)
+            controller.release(1.0)
+            shrunk = controller.limit
+            for _ in range(20):
+                await controller.acquire(PRIORITY_CHARGE)
+                controller.release(0.01)
+            return shrunk, controller.limit
+
+        shrunk, grown = asyncio.run(main())
+        assert shrunk == pytest.approx(9.0)
+        assert grown > shrunk
+
+    def test_refunds_preempt_queued_charges(self):
+        """Test freed slots go to the most urgent class first."""
+        controller = AdmissionController(initial_limit=1, min_limit=1)
+        order = []
+
+        async def request(priority, name):
+            async with controller.admit(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async def main():
+            await controller.acquire(PRIORITY_CHARGE)
+            tasks = [asyncio.create_task(request(PRIORITY_CHARGE, "charge")),
+                     asyncio.create_task(request(PRIORITY_REFUND, "refund"))]
+            await asyncio.sleep(0)
+            controller.release(0.0)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        assert order == ["refund", "charge"]
+
+    def test_full_queue_sheds(self):
+        """Test a full queue rejects charges and evicts them for refunds."""
+        controller = AdmissionController(initial_limit=1, min_limit=1, max_queue_depth=1)
+
+        async def main():
+            await controller.acquire(PRIORITY_CHARGE)
+            queued = asyncio.create_task(controller.acquire(PRIORITY_CHARGE))
+            await asyncio.sleep(0)
+            with pytest.raises(processor.HTTPException) as overloaded:
+                await controller.acquire(PRIORITY_CHARGE)
+            refund = asyncio.create_task(controller.acquire(PRIORITY_REFUND))
+            await asyncio.sleep(0)
+            with pytest.raises(processor.HTTPException) as preempted:
+                await queued
+            controller.release(0.0)
+            await refund
+            return overloaded.value, preempted.value
+
+        overloaded, preempted = asyncio.run(main())
+        assert overloaded.status_code == 429
+        assert int(overloaded.headers["Retry-After"]) >= 1
+        assert preempted.status_code == 503
+        stats = controller.stats()["classes"]
+        assert stats["charge"]["shed"] == 2
+        assert stats["charge"]["preempted"] == 1
+        assert stats["refund"]["admitted"] == 1
+
+    def test_overloaded_charge_endpoint(self, monkeypatch):
+        """Test the charge route sheds with Retry-After and reports it."""
+        controller = AdmissionController(initial_limit=1, min_limit=1, max_queue_depth=0)
+        controller.in_flight = 1
+        monkeypatch.setattr(processor, "admission_controller", controller)
+        response = client.post("/api/payment/charge", json={
+            "amount": 5.0,
+            "payment_method": VALID_CARD
+        })
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        stats = client.get("/api/payment/admission/stats").json()
+        assert stats["classes"]["charge"]["shed"] == 1
+        assert stats["in_flight"] == 1
+
+
+class TestBulkCustomers:
+    """Test cases for the bulk customer endpoint."""
+
+    def test_streams_results(self):
+        """Test each customer gets an NDJSON result line."""
+        response = client.post("/api/payment/customers/bulk", json={
+            "customers": [
+                {"email": "one@example.com", "name": "One"},
+                {"email": ""},
+                {"email": "two@example.com"}
+            ],
+            "rate_per_second": 1000
+        })
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        by_index = {line["index"]: line for line in lines}
+        assert sorted(by_index) == [0, 1, 2]
+        assert by_index[0]["customer_id"].startswith("cus_")
+        assert by_index[1]["error"] == "Missing email"
+        assert by_index[2]["error"] is None
+
+    def test_rejects_bad_concurrency(self):
+        """Test out-of-range concurrency is rejected up front."""
+        response = client.post("/api/payment/customers/bulk", json={
+            "customers": [{"email": "one@example.com"}],
+            "concurrency": 0
+        })
+        assert response.status_code == 400
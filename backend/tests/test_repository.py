@@ -0,0 +1,96 @@
+"""
+Tests for the SQL Payment Repository
+Coverage: MEDIUM - Runs against in-memory SQLite
+"""
+
+import asyncio
+from app.payment import processor
+from app.payment.processor import PaymentMethod, PaymentRequest
+from app.payment.repository import SqlPaymentRepository
+
+
+def payment(payment_id, customer_id="cus_repo", created_at=100):
+    return {
+        "payment_id": payment_id,
+        "customer_id": customer_id,
+        "amount": 10.0,
+        "currency": "usd",
+        "status": "succeeded",
+        "created_at": created_at,
+        "card_last4": "0366"
+    }
+
+
+def run_with_repository(test):
+    """Run an async test body against a fresh in-memory repository."""
+    async def main():
+        repository = SqlPaymentRepository("sqlite+aiosqlite:///:memory:")
+        await repository.init()
+        try:
+            await test(repository)
+        finally:
+            await repository.close()
+    asyncio.run(main())
+
+
+class TestSqlPaymentRepository:
+    """Test cases for SqlPaymentRepository."""
+
+    def test_bulk_insert_and_get(self):
+        """Test bulk inserts are readable by ID."""
+        async def test(repository):
+            await repository.add_payments([payment(f"pay_{i}") for i in range(100)])
+            stored = await repository.get_payment("pay_42")
+            assert stored == payment("pay_42")
+            assert await repository.get_payment("pay_missing") is None
+        run_with_repository(test)
+
+    def test_keyset_listing(self):
+        """Test keyset pages by customer in (created_at, payment_id) order."""
+        async def test(repository):
+            await repository.add_payments(
+                [payment(f"pay_{i}", created_at=100 + i // 2) for i in range(6)]
+                + [payment("pay_other", customer_id="cus_other")]
+            )
+            first = await repository.list_payments("cus_repo", limit=4)
+            after = (first[-1]["created_at"], first[-1]["payment_id"])
+            rest = await repository.list_payments("cus_repo", limit=4, after=after)
+            ids = [p["payment_id"] for p in first + rest]
+            assert ids == [f"pay_{i}" for i in range(6)]
+        run_with_repository(test)
+
+    def test_status_updates_and_refunds(self):
+        """Test batched status updates and refund storage."""
+        async def test(repository):
+            await repository.add_payments([payment("pay_a"), payment("pay_b")])
+            await repository.update_statuses({"pay_a": "failed", "pay_b": "disputed"})
+            assert (await repository.get_payment("pay_a"))["status"] == "failed"
+            await repository.add_refund({
+                "refund_id": "ref_1",
+                "payment_id": "pay_a",
+                "amount": 1.0,
+                "reason": None,
+                "status": "succeeded",
+                "created_at": 101
+            })
+            refunds = await repository.list_refunds("pay_a")
+            assert [r["refund_id"] for r in refunds] == ["ref_1"]
+        run_with_repository(test)
+
+    def test_charge_writes_through(self, monkeypatch):
+        """Test the charge path persists new payments."""
+        async def approve(amount, card):
+            return {"success": True, "transaction_id": "txn_test"}
+
+        async def test(repository):
+            monkeypatch.setattr(processor, "payment_repository", repository)
+            monkeypatch.setattr(processor, "process_payment_with_stripe", approve)
+            response = await processor.execute_charge(PaymentRequest(
+                amount=5.0,
+                payment_method=PaymentMethod(
+                    card_number="4532015112830366", exp_month=12, exp_year=2030, cvv="123"
+                )
+            ))
+            stored = await repository.get_payment(response.payment_id)
+            assert stored["amount"] == 5.0
+        run_with_repository(test)
@@ -0,0 +1,402 @@
+"""
+Tests for the Async Stripe Client
+Coverage: MEDIUM - Exercised against the local mock provider
+"""
+
+import asyncio
+import threading
+import httpx
+import pytest
+from app.payment import mock_provider
+from app.payment.resilience import CircuitBreaker, LatencyTracker, RateLimiter, RetryPolicy
+from app.payment.stripe import (
+    AsyncStripeClient, ProviderUnavailableError, ResilientStripeClient, StripeAPIError,
+    StripeClient, coalesced, payment_intent_cache, single_flight
+)
+
+
+def mock_client(**kwargs):
+    """Async client wired to the in-process mock provider app."""
+    return AsyncStripeClient(
+        api_key="sk_test",
+        base_url="http://mock-provider/v1",
+        transport=httpx.ASGITransport(app=mock_provider.app),
+        **kwargs
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_declines(monkeypatch):
+    monkeypatch.setattr(mock_provider, "DECLINE_RATE", 0.0)
+
+
+@pytest.fixture(autouse=True)
+def empty_intent_cache():
+    payment_intent_cache.clear()
+    yield
+    payment_intent_cache.clear()
+
+
+class TestAsyncStripeClient:
+    """Test cases for AsyncStripeClient."""
+
+    def test_payment_intent_round_trip(self):
+        """Test creating, confirming and retrieving an intent."""
+        async def main():
+            client = mock_client()
+            try:
+                intent = await client.create_payment_intent(amount=1250, currency="eur")
+                assert intent["status"] == "requires_payment_method"
+                confirmed = await client.confirm_payment_intent(intent["id"])
+                assert confirmed["status"] == "succeeded"
+                fetched = await client.retrieve_payment_intent(intent["id"])
+                assert fetched["amount"] == 1250
+                assert fetched["currency"] == "eur"
+            finally:
+                await client.aclose()
+
+        asyncio.run(main())
+
+    def test_concurrent_calls_share_pool(self):
+        """Test many concurrent calls over one pooled client."""
+        async def main():
+            client = mock_client(max_connections=4)
+            try:
+                customers = await asyncio.gather(*[
+                    client.create_customer(f"user{i}@example.com") for i in range(50)
+                ])
+            finally:
+                await client.aclose()
+            return customers
+
+        customers = asyncio.run(main())
+        assert len({c["id"] for c in customers}) == 50
+
+    def test_error_status_raises(self):
+        """Test provider errors surface as StripeAPIError."""
+        async def main():
+            client = mock_client()
+            try:
+                await client.retrieve_payment_intent("pi_missing")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(StripeAPIError) as exc_info:
+            asyncio.run(main())
+        assert exc_info.value.status_code == 404
+
+
+async def no_sleep(seconds):
+    pass
+
+
+def scripted_client(handler, **kwargs):
+    """Resilient client over a transport that answers with `handler`."""
+    client = AsyncStripeClient(
+        api_key="sk_test",
+        base_url="http://provider/v1",
+        transport=httpx.MockTransport(handler)
+    )
+    return ResilientStripeClient(client, sleep=no_sleep, **kwargs)
+
+
+class TestResilientStripeClient:
+    """Test cases for retries, hedging and circuit breaking."""
+
+    def test_retries_reuse_idempotency_key(self):
+        """Test transient failures are retried under one idempotency key."""
+        keys = []
+
+        def handler(request):
+            keys.append(request.headers.get("Idempotency-Key"))
+            if len(keys) < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"id": "pi_1", "status": "succeeded"})
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                return await client.create_payment_intent(amount=100, confirm=True)
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(main())["id"] == "pi_1"
+        assert len(keys) == 3
+        assert keys[0] is not None and len(set(keys)) == 1
+
+    def test_client_errors_not_retried(self):
+        """Test 4xx responses fail immediately."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(402)
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                await client.create_refund("pi_1")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(StripeAPIError) as exc_info:
+            asyncio.run(main())
+        assert exc_info.value.status_code == 402
+        assert len(calls) == 1
+
+    def test_breaker_opens_and_recovers(self):
+        """Test an endpoint fails fast while open and closes after a probe."""
+        now = [0.0]
+        healthy = [False]
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if healthy[0]:
+                return httpx.Response(200, json={"id": "pi_1"})
+            return httpx.Response(500)
+
+        async def main():
+            client = scripted_client(
+                handler,
+                retry=RetryPolicy(max_attempts=1),
+                breaker_factory=lambda: CircuitBreaker(
+                    failure_threshold=2, reset_timeout=5.0, clock=lambda: now[0]
+                )
+            )
+            try:
+                for _ in range(2):
+                    with pytest.raises(StripeAPIError):
+                        await client.retrieve_payment_intent("pi_1")
+                with pytest.raises(ProviderUnavailableError):
+                    await client.retrieve_payment_intent("pi_1")
+                # Other endpoints have their own breaker
+                with pytest.raises(StripeAPIError) as other:
+                    await client.create_customer("a@example.com")
+                assert not isinstance(other.value, ProviderUnavailableError)
+
+                now[0] = 5.0
+                healthy[0] = True
+                await client.retrieve_payment_intent("pi_1")
+                return client.stats()
+            finally:
+                await client.aclose()
+
+        stats = asyncio.run(main())
+        assert len(calls) == 4
+        assert stats["endpoints"]["payment_intents.retrieve"]["state"] == "closed"
+        assert stats["endpoints"]["payment_intents.retrieve"]["rejected"] == 1
+
+    def test_slow_read_is_hedged(self):
+        """Test a read slower than the recent p95 races a duplicate."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(5)
+            return httpx.Response(200, json={"id": "pi_1", "attempt": len(calls)})
+
+        async def main():
+            client = scripted_client(handler, hedge_min_samples=1)
+            tracker = LatencyTracker()
+            tracker.add(0.01)
+            client.latencies["payment_intents.retrieve"] = tracker
+            try:
+                return await asyncio.wait_for(client.retrieve_payment_intent("pi_1"), 2)
+            finally:
+                await client.aclose()
+
+        result = asyncio.run(main())
+        assert result["attempt"] == 2
+        assert len(calls) == 2
+
+    def test_mock_provider_replays_idempotent_posts(self):
+        """Test the mock provider answers a repeated key with the same object."""
+        async def main():
+            client = mock_client()
+            try:
+                first = await client.create_customer("a@example.com", idempotency_key="idem_1")
+                second = await client.create_customer("a@example.com", idempotency_key="idem_1")
+            finally:
+                await client.aclose()
+            return first, second
+
+        first, second = asyncio.run(main())
+        assert first["id"] == second["id"]
+
+
+class TestPaymentIntentCache:
+    """Test cases for the webhook-refreshed intent cache."""
+
+    def test_repeat_reads_stay_in_process(self):
+        """Test only the first read of an intent reaches the provider."""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json={"id": "pi_1", "status": "processing"})
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                return [await client.retrieve_payment_intent("pi_1") for _ in range(5)]
+            finally:
+                await client.aclose()
+
+        before = payment_intent_cache.stats()
+        intents = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(i["status"] == "processing" for i in intents)
+        after = payment_intent_cache.stats()
+        assert after["hits"] - before["hits"] == 4
+        assert after["misses"] - before["misses"] == 1
+
+    def test_webhook_updates_and_invalidates(self):
+        """Test status events replace or drop the cached intent."""
+        client = StripeClient()
+        assert client.retrieve_payment_intent("pi_2")["status"] == "succeeded"
+
+        client.handle_webhook_event({
+            "type": "payment_intent.payment_failed",
+            "data": {"object": {"id": "pi_2", "status": "requires_payment_method"}}
+        })
+        assert client.retrieve_payment_intent("pi_2")["status"] == "requires_payment_method"
+
+        invalidations = payment_intent_cache.invalidations
+        client.handle_webhook_event({"type": "payment_intent.canceled", "data": {"id": "pi_2"}})
+        assert payment_intent_cache.get("pi_2") is None
+        assert payment_intent_cache.invalidations == invalidations + 1
+
+
+class TestSingleFlight:
+    """Test cases for coalescing concurrent identical provider calls."""
+
+    def test_concurrent_async_reads_share_one_request(self):
+        """Test a burst of identical retrieves makes one provider call."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"id": "pi_hot", "status": "processing"})
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                return await asyncio.gather(*[
+                    client.retrieve_payment_intent("pi_hot", timeout=i) for i in range(1, 51)
+                ])
+            finally:
+                await client.aclose()
+
+        intents = asyncio.run(main())
+        assert len(calls) == 1
+        assert len({id(i) for i in intents}) == 50
+        assert all(i["status"] == "processing" for i in intents)
+
+    def test_sync_calls_coalesce_on_normalized_arguments(self):
+        """Test threads with equivalent arguments share one execution."""
+        release = threading.Event()
+        calls = []
+
+        class Client:
+            @coalesced(normalize={"email": str.lower})
+            def lookup(self, email, limit=10):
+                calls.append(email)
+                release.wait(5)
+                return {"email": email.lower()}
+
+        client = Client()
+        results = []
+        threads = [
+            threading.Thread(target=lambda e=e: results.append(client.lookup(e)))
+            for e in ["a@example.com", "A@Example.com", "a@example.com"]
+        ]
+        threads.append(threading.Thread(
+            target=lambda: results.append(client.lookup(email="a@example.com", limit=10))
+        ))
+        before = single_flight.coalesced
+        for thread in threads:
+            thread.start()
+        while single_flight.coalesced - before < 3 and any(t.is_alive() for t in threads):
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert [r["email"] for r in results] == ["a@example.com"] * 4
+        assert client.lookup("b@example.com", limit=5) == {"email": "b@example.com"}
+        assert len(calls) == 2
+
+    def test_errors_reach_every_waiter(self):
+        """Test a failed shared call raises in all coalesced callers."""
+        def handler(request):
+            return httpx.Response(404)
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                return await asyncio.gather(*[
+                    client.retrieve_payment_intent("pi_gone") for _ in range(3)
+                ], return_exceptions=True)
+            finally:
+                await client.aclose()
+
+        errors = asyncio.run(main())
+        assert all(isinstance(e, StripeAPIError) and e.status_code == 404 for e in errors)
+
+
+class TestBulkCustomers:
+    """Test cases for bulk customer creation."""
+
+    def test_bounded_concurrency_and_per_item_errors(self):
+        """Test all items complete, failures are per item and concurrency is capped."""
+        in_flight = [0, 0]
+
+        async def handler(request):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+            await asyncio.sleep(0.001)
+            in_flight[0] -= 1
+            body = request.content.decode()
+            if "bad" in body:
+                return httpx.Response(400)
+            return httpx.Response(200, json={"id": f"cus_{len(body)}"})
+
+        def customers():
+            for i in range(100):
+                yield {"email": f"{'bad' if i % 10 == 0 else 'ok'}{i}@example.com"}
+            yield {"name": "No Email"}
+
+        async def main():
+            client = scripted_client(handler)
+            try:
+                return [r async for r in client.create_customers_bulk(
+                    customers(), concurrency=8, rate_per_second=None
+                )]
+            finally:
+                await client.aclose()
+
+        results = asyncio.run(main())
+        assert sorted(r.index for r in results) == list(range(101))
+        errors = [r for r in results if r.error]
+        assert len(errors) == 11
+        assert any(r.error == "Missing email" for r in errors)
+        assert in_flight[1] <= 8
+
+    def test_rate_limiter_paces_calls(self):
+        """Test the token bucket spaces acquisitions at the configured rate."""
+        now = [0.0]
+
+        async def fake_sleep(seconds):
+            now[0] += seconds
+
+        async def main():
+            limiter = RateLimiter(10, clock=lambda: now[0], sleep=fake_sleep)
+            for _ in range(21):
+                await limiter.acquire()
+
+        asyncio.run(main())
+        assert now[0] == pytest.approx(2.0)
@@ -3,6 +3,7 @@ Tests for Utility Functions
 Coverage: HIGH - Utilities are well-tested
 """
 
+import time
 import pytest
 from app.utils.helpers import (
     get_app_info,
@@ -26,6 +27,14 @@ from app.utils.validators import (
     validate_cvv,
     sanitize_input
 )
+from app.utils.cache import TTLCache
+from app.utils.ids import IdGenerator, id_timestamp_ms
+from app.utils.cards import (
+    CARD_NETWORK_BIN_RANGES,
+    card_number_error,
+    luhn_valid,
+    validate_card_numbers
+)
 
 
 class TestHelpers:
@@ -170,3 +179,107 @@ class TestValidators:
         result = sanitize_input("<script>alert('xss')</script>")
         assert "<script>" not in result
         assert "&lt;script&gt;" in result
+
+
+class TestCardEngine:
+    """Test cases for the shared card validation engine."""
+    
+    def test_luhn_valid(self):
+        """Test scalar Luhn fast path."""
+        assert luhn_valid("4532015112830366") is True
+        assert luhn_valid("4532015112830367") is False
+        assert luhn_valid("378282246310005") is True  # odd length
+    
+    def test_card_number_error(self):
+        """Test scalar error messages."""
+        assert card_number_error("4532 0151 1283 0366") is None
+        assert card_number_error("") == "Card number is required"
+        assert card_number_error("4532abcd12830366") == "Card number must contain only digits"
+        assert card_number_error("453201") == "Invalid card number length"
+        assert card_number_error("4532015112830367") == "Invalid card number"
+    
+    def test_bin_ranges(self):
+        """Test BIN range restriction."""
+        visa = CARD_NETWORK_BIN_RANGES["visa"]
+        assert card_number_error("4532015112830366", visa) is None
+        assert card_number_error("5555555555554444", visa) == "Unsupported card network"
+    
+    def test_bulk_matches_scalar(self):
+        """Test vectorized checks agree with the scalar path."""
+        cards = [
+            "4532015112830366",
+            "4532-0151-1283-0366",
+            "4532015112830367",
+            "378282246310005",
+            "6011111111111117",
+            "12345",
+            "45320151128303664532",
+            "4532abcd12830366",
+            "",
+        ]
+        result = validate_card_numbers(cards, chunk_rows=4)
+        assert list(result.valid) == [card_number_error(c) is None for c in cards]
+        assert list(result.length_ok) == [True, True, True, True, True, False, False, True, False]
+        assert result.digits_ok[6] and not result.digits_ok[7]
+    
+    def test_bulk_bin_ranges(self):
+        """Test vectorized BIN range checks."""
+        result = validate_card_numbers(
+            ["4532015112830366", "5555555555554444"],
+            bin_ranges=CARD_NETWORK_BIN_RANGES["mastercard"]
+        )
+        assert list(result.bin_ok) == [False, True]
+        assert list(result.valid) == [False, True]
+
+
+class TestIdGenerator:
+    """Test cases for the shared ID generator."""
+    
+    def test_unique_within_same_millisecond(self):
+        """Test IDs minted in one clock tick do not collide."""
+        generator = IdGenerator(worker_id=7)
+        ids = [generator.next_id("pay") for _ in range(10000)]
+        assert len(set(ids)) == len(ids)
+        assert all(i.startswith("pay_") and len(i) == 23 for i in ids)
+    
+    def test_time_ordered(self):
+        """Test string order follows generation order across ticks."""
+        generator = IdGenerator(worker_id=7)
+        first = generator.next_id("pay")
+        time.sleep(0.002)
+        second = generator.next_id("pay")
+        assert first < second
+    
+    def test_embedded_timestamp(self):
+        """Test the timestamp can be recovered from an integer ID."""
+        generator = IdGenerator(worker_id=7)
+        now_ms = int(time.time() * 1000)
+        assert abs(id_timestamp_ms(generator.next_int()) - now_ms) < 1000
+    
+    def test_worker_ids_differ(self):
+        """Test different workers produce disjoint IDs."""
+        a = IdGenerator(worker_id=1)
+        b = IdGenerator(worker_id=2)
+        assert a.next_int() != b.next_int()
+        with pytest.raises(ValueError):
+            IdGenerator(worker_id=1024)
+
+
+class TestTTLCache:
+    """Test cases for the LRU+TTL cache."""
+
+    def test_expiry_and_eviction(self):
+        """Test entries expire after the TTL and the LRU entry is evicted."""
+        now = [0.0]
+        cache = TTLCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        now[0] = 10.0
+        assert cache.get("a") is None
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["expirations"] == 1
+        assert (stats["hits"], stats["misses"]) == (1, 2)
@@ -0,0 +1,85 @@
+"""
+Tests for the Payment Write-Ahead Log
+Coverage: MEDIUM - Recovery, compaction and group commit
+"""
+
+import asyncio
+import os
+from app.payment.wal import WriteAheadLog
+
+
+def payment(payment_id, status="succeeded"):
+    return {"payment_id": payment_id, "amount": 1.0, "status": status}
+
+
+class TestWriteAheadLog:
+    """Test cases for WriteAheadLog."""
+
+    def test_replay_after_restart(self, tmp_path):
+        """Test records survive a close and reopen."""
+        wal = WriteAheadLog(str(tmp_path))
+        assert list(wal.replay()) == []
+        wal.start()
+        lsn = wal.append("payment", payment("pay_1"))
+        wal.append("status", {"payment_id": "pay_1", "status": "failed"})
+        assert wal.wait_durable(lsn, timeout=5)
+        wal.close()
+
+        reopened = WriteAheadLog(str(tmp_path))
+        assert list(reopened.replay()) == [
+            ("payment", payment("pay_1")),
+            ("status", {"payment_id": "pay_1", "status": "failed"}),
+        ]
+        assert reopened.last_lsn == 2
+
+    def test_snapshot_then_tail(self, tmp_path):
+        """Test recovery reads the snapshot plus only the newer log tail."""
+        wal = WriteAheadLog(str(tmp_path), segment_bytes=1)
+        list(wal.replay())
+        wal.start()
+        for i in range(5):
+            wal.wait_durable(wal.append("payment", payment(f"pay_{i}")), timeout=5)
+        lsn = wal.last_lsn
+        wal.write_snapshot(lsn, [("payment", payment(f"pay_{i}")) for i in range(5)])
+        wal.wait_durable(wal.append("payment", payment("pay_tail")), timeout=5)
+        wal.close()
+
+        files = sorted(os.listdir(tmp_path))
+        assert files.count(f"snapshot-{lsn:020d}.snap") == 1
+        # Segments wholly covered by the snapshot are removed
+        assert len([f for f in files if f.startswith("wal-")]) <= 2
+
+        reopened = WriteAheadLog(str(tmp_path))
+        records = list(reopened.replay())
+        assert [d["payment_id"] for _, d in records] == [f"pay_{i}" for i in range(5)] + ["pay_tail"]
+
+    def test_torn_tail_ignored(self, tmp_path):
+        """Test a partially written last frame is dropped on recovery."""
+        wal = WriteAheadLog(str(tmp_path))
+        list(wal.replay())
+        wal.start()
+        wal.wait_durable(wal.append("payment", payment("pay_ok")), timeout=5)
+        wal.close()
+        segment = [f for f in os.listdir(tmp_path) if f.startswith("wal-")][0]
+        with open(tmp_path / segment, "ab") as f:
+            f.write(b"\x10\x00\x00\x00garbage")
+
+        records = list(WriteAheadLog(str(tmp_path)).replay())
+        assert records == [("payment", payment("pay_ok"))]
+
+    def test_group_commit(self, tmp_path):
+        """Test concurrent durable appends share fsyncs."""
+        wal = WriteAheadLog(str(tmp_path))
+        list(wal.replay())
+        wal.start()
+
+        async def main():
+            await asyncio.gather(*[
+                wal.append_durable([("payment", payment(f"pay_{i}"))]) for i in range(200)
+            ])
+
+        asyncio.run(main())
+        stats = wal.stats()
+        wal.close()
+        assert stats["durable_lsn"] == 200
+        assert stats["commits"] < 200